@@ -31,6 +31,10 @@ import sys
 import fylmlib.config as config
 from fylmlib.console import console
 from fylmlib.processor import processor
+from fylmlib.journal import journal
+from fylmlib.watch import watch
+from fylmlib.control import control
+from fylmlib.plans import plans
 import fylmlib.operations as ops
 import fylmlib.notify as notify
 import fylmlib.counter as counter
@@ -44,6 +48,11 @@ def main():
         # Initialize the success counter.
         counter.count = 0
 
+        # If an instance is running in watch mode, let it process the source
+        # dir(s), since it has already loaded the existing films.
+        if config.submit is True and control.submit(config.source_dirs) is not None:
+            return
+
         # Print the welcome message to the console.
         console().print_welcome()
 
@@ -54,6 +63,10 @@ def main():
         # Verify that destination paths exist.
         ops.dirops.verify_root_paths_exist(list(config.destination_dirs.values()))
 
+        # Recover any file operations that were interrupted in a previous run,
+        # before loading existing films.
+        journal.recover()
+
         # Load duplicates before film processing begins.
         ops.dirops.get_existing_films(config.destination_dirs)
 
@@ -62,11 +75,24 @@ def main():
         # Verify that source path(s) exist.
         ops.dirops.verify_root_paths_exist(config.source_dirs)
 
-        # Retrieve a list of films from the current source dir(s) and process each film.
-        processor.iterate(ops.dirops.get_new_films(config.source_dirs))
+        # In watch mode, keep running and process new films as they arrive.
+        # This runs until interrupted.
+        if config.watch is True:
+            watch.run()
+
+        # If applying a plan, process the films in the plan, otherwise retrieve a list
+        # of films from the current source dir(s) and process each film.
+        processor.iterate(plans.load(config.apply) if config.apply
+            else ops.dirops.get_new_films(config.source_dirs))
+
+        # If writing a plan, save it now that every film has been planned.
+        if config.plan:
+            plans.write(config.plan)
 
-        # When all films have been processed, notify Plex (if enabled).
-        notify.plex()
+        # When all films have been processed, wait for queued notifications
+        # (and Plex scans) to be sent before exiting.
+        if not notify.flush(notify.flush_timeout()):
+            console().yellow(f"Notifications were not sent in time: {'; '.join(notify.unsent())}").print()
 
         # Print the summary.
         console().print_exit(counter.count)
@@ -87,6 +113,8 @@ def main():
         # Don't leave the cursor hidden
         from fylmlib.cursor import cursor
         cursor.show()
+        # Release the journal, so it can be recovered if this run was interrupted
+        journal.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
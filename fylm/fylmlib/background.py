@@ -0,0 +1,181 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Background processing for Fylm.
+
+This module runs items through a function in a background thread, in the
+order they are added, while the main thread carries on (e.g. prompting the
+user in interactive mode). Console output printed while an item is being
+processed is held until the main thread is ready for it, and a status line
+shows the progress of the item in progress.
+
+    Background: the main class exported by this module.
+"""
+
+from __future__ import unicode_literals, print_function
+from builtins import *
+
+import sys
+import threading
+from queue import Queue, Empty
+
+import fylmlib.config as config
+from fylmlib.console import console
+import fylmlib.progress as progress
+
+class Background(object):
+    """Runs items through a function in a background thread.
+
+    Attributes:
+        func:       Function that takes an item and processes it.
+    """
+    def __init__(self, func):
+        self.func = func
+        self._queue = Queue()
+        self._jobs = []
+        self._thread = None
+        self._error = None
+
+    def add(self, item, name):
+        """Start processing an item once the items before it are finished.
+
+        Args:
+            item: item to process.
+            name: (str, utf-8) name of the item, shown in the status line.
+        """
+        job = _Job(item, name)
+        self._jobs.append(job)
+        self._queue.put(job)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._work, daemon=True)
+            self._thread.start()
+
+    def remaining(self) -> int:
+        """Number of items that are not finished.
+        """
+        return len([j for j in self._jobs if not j.done.is_set()])
+
+    def status(self) -> str:
+        """Describe the progress of the items that have been added.
+
+        Returns:
+            A one line status, or None if every item is finished.
+        """
+        pending = [j for j in self._jobs if not j.done.is_set()]
+        if len(pending) == 0:
+            return None
+        job = pending[0]
+        finished = len(self._jobs) - len(pending)
+        percent = 100 * job.output.copied / job.output.total if job.output.total else 0
+        return f"{progress.progress_bar(percent)} {job.name} ({finished + 1} of {len(self._jobs)})"
+
+    def print_status(self):
+        """Print the status as a line of its own, if any items are not finished.
+        """
+        status = self.status()
+        if status is not None:
+            console().dark_gray().indent(status).print(should_log=False)
+
+    def join(self):
+        """Wait for every item to finish, printing the held output of each
+        item in order, and redrawing the status line while waiting. If an
+        item raised an exception, it is raised once every item has finished.
+        """
+        for job in self._jobs:
+            while not job.done.wait(0.2):
+                self._draw_status()
+            if not config.plaintext:
+                console.clearline()
+            job.output.flush()
+
+        if self._error is not None:
+            raise self._error
+
+    def cancel(self) -> list:
+        """Don't start any items that have not started yet. The item in
+        progress, if any, is left to finish.
+
+        Returns:
+            The items that are still being processed.
+        """
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except Empty:
+                break
+            job.done.set()
+        return [j.item for j in self._jobs if j.started and not j.done.is_set()]
+
+    def _draw_status(self):
+        """Draw the status over the current line.
+        """
+        status = self.status()
+        if status is not None and not config.plaintext:
+            console.clearline()
+            print(f'      {status}', end='\r')
+            sys.stdout.flush()
+
+    def _work(self):
+        """Worker thread loop.
+        """
+        while True:
+            job = self._queue.get()
+            job.started = True
+            console.capture(job.output)
+            try:
+                if self._error is None:
+                    self.func(job.item)
+            except Exception as e:
+                self._error = e
+            finally:
+                console.capture(None)
+                job.done.set()
+
+class _Job(object):
+    """An item added to a Background, with its held output.
+    """
+    def __init__(self, item, name):
+        self.item = item
+        self.name = name
+        self.output = _Output()
+        self.started = False
+        self.done = threading.Event()
+
+class _Output(object):
+    """Console output sink for a single item. Output is held until it is
+    flushed, and copy progress is recorded for the status line.
+    """
+    live = False
+
+    def __init__(self):
+        self.copied = 0
+        self.total = 0
+        self._held = []
+        self._lock = threading.Lock()
+
+    def defer(self, c, should_log):
+        with self._lock:
+            self._held.append((c, should_log))
+            return True
+
+    def progress(self, copied, total):
+        self.copied = copied
+        self.total = total
+
+    def flush(self):
+        with self._lock:
+            for (c, should_log) in self._held:
+                c.output(should_log)
+            self._held = []
@@ -139,7 +139,7 @@ def is_exact_duplicate(file, existing_file):
 def is_identical(file, existing_file):
     """Determine if a film is an identical copy of another. To qualify as
     an identical duplicate, it must pass is_duplicate, is_exact_duplicate, and
-    the file sizes must be equal.
+    the file contents must match.
 
     Args:
         file: (Film.File) the first file to compare.
@@ -151,7 +151,25 @@ def is_identical(file, existing_file):
     if not is_exact_duplicate(file, existing_file):
         return False
 
-    return file.size == existing_file.size
+    return is_same_content(file, existing_file)
+
+def is_same_content(file, existing_file):
+    """Determine if two files have byte-identical contents, regardless of
+    how they are named. Sizes are compared first, so files are only read
+    (a few sampled MB each) when their sizes match.
+
+    Args:
+        file: (Film.File) the first file to compare.
+        existing_file: (Film.File) the second file to compare.
+    Returns:
+        True if the file contents match, else False
+    """
+
+    if file.size != existing_file.size:
+        return False
+
+    fingerprint = file.fingerprint
+    return fingerprint is not None and fingerprint == existing_file.fingerprint
 
 def resolution(file, existing_file) -> ComparisonResult:
     """Compare two file resolutions to determine if one is better than the other.
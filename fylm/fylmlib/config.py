@@ -19,6 +19,7 @@ This module loads configuration options from config.yaml, and optionally
 CLI argumants.
 
     config: an instance of the main class (Config) exported by this module.
+    Derived: an immutable snapshot of lookup structures derived from config.
 """
 
 from __future__ import unicode_literals, print_function
@@ -26,8 +27,10 @@ from __future__ import unicode_literals, print_function
 import argparse
 import yaml
 import os
+import re
 import sys
 import codecs
+from types import MappingProxyType
 from datetime import timedelta
 from yaml import Loader, SafeLoader
 
@@ -51,6 +54,143 @@ def construct_yaml_str(self, node):
 Loader.add_constructor(u'tag:yaml.org,2002:str', construct_yaml_str)
 SafeLoader.add_constructor(u'tag:yaml.org,2002:str', construct_yaml_str)
 
+class Derived(object):
+    """An immutable snapshot of lookup structures derived from config.
+
+    Hot paths like extension, ignore string, and min filesize checks read from
+    this snapshot instead of re-deriving the same values from config on
+    every call. It is built when config is loaded or reloaded, and rebuilt
+    whenever one of the options it is derived from is reassigned.
+
+    Attributes:
+        video_exts:         frozenset of video file extensions, e.g. '.mkv'.
+
+        extra_exts:         frozenset of additional file extensions, e.g. '.srt'.
+
+        valid_exts:         frozenset of all video and additional file extensions.
+
+        ignore_strings:     frozenset of lowercased ignore strings.
+
+        ignore_pattern:     Compiled pattern that matches any lowercased ignore
+                            string, or None if there are no ignore strings.
+
+        keep_period:        Compiled case-insensitive pattern that matches any
+                            string that should retain its periods, or None.
+
+        keep_period_map:    Read-only map of each lowercased keep_period string
+                            to its configured replacement.
+
+        destination_dirs:   Read-only map of resolution to destination dir.
+
+        min_filesize:       Read-only map of resolution to minimum filesize, in
+                            bytes. Always contains a 'default' key.
+
+        transfer_modes:     Read-only map of normalized destination dir to transfer
+                            mode. Always contains a 'default' key.
+    """
+
+    # Keys of config that this snapshot is derived from.
+    sources = frozenset(['video_exts', 'extra_exts', 'ignore_strings', 'keep_period',
+                         'destination_dirs', 'min_filesize', 'transfer_modes'])
+
+    # Valid values for transfer_modes.
+    transfer_mode_names = frozenset(['reflink', 'copy', 'hardlink', 'symlink'])
+
+    def __init__(self, config):
+        mb = 1024 * 1024
+
+        exts = lambda l: frozenset(f".{e.lstrip('.')}" for e in (l or []))
+        ignore_strings = frozenset(s.lower() for s in (config.ignore_strings or []))
+
+        # If min_filesize is an int, it applies to all resolutions, otherwise
+        # we assume that it is an AttrMap of resolutions.
+        min_filesize = config.min_filesize or 0
+        if isinstance(min_filesize, (int, float)):
+            min_filesize = {'default': min_filesize}
+        min_filesize = {k: int(v * mb) for k, v in min_filesize.items()}
+        min_filesize.setdefault('default', 0)
+
+        self._set('video_exts', exts(config.video_exts))
+        self._set('extra_exts', exts(config.extra_exts))
+        self._set('valid_exts', self.video_exts | self.extra_exts)
+        self._set('ignore_strings', ignore_strings)
+        self._set('ignore_pattern', re.compile('|'.join(
+            re.escape(s) for s in sorted(ignore_strings))) if ignore_strings else None)
+
+        # Compile keep_period into a single alternation, longest first, so that
+        # restoring periods costs the same regardless of how many are configured.
+        keep_period_map = {}
+        for s in (config.keep_period or []):
+            keep_period_map.setdefault(s.lower(), s)
+        self._set('keep_period', re.compile(r'\b(?:' + '|'.join(
+            re.escape(s) for s in sorted(keep_period_map, key=len, reverse=True)) + r')\b', re.I)
+            if keep_period_map else None)
+        self._set('keep_period_map', MappingProxyType(keep_period_map))
+        self._set('destination_dirs', MappingProxyType(dict(config.destination_dirs or {})))
+        self._set('min_filesize', MappingProxyType(min_filesize))
+
+        # Map each destination dir to its transfer mode, so that the mode can
+        # be looked up from a destination path.
+        transfer_modes = {'default': 'copy'}
+        for k, v in (config.transfer_modes or {}).items():
+            if v not in self.transfer_mode_names:
+                raise ValueError(f"Invalid transfer mode '{v}' for '{k}'")
+            if k == 'default':
+                transfer_modes['default'] = v
+            elif k in self.destination_dirs:
+                transfer_modes[os.path.normpath(self.destination_dirs[k])] = v
+        self._set('transfer_modes', MappingProxyType(transfer_modes))
+
+    def _set(self, name, value):
+        object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Derived config is immutable; cannot set '{name}'")
+
+    def destination_dir(self, resolution):
+        """Get the root destination dir for a resolution.
+
+        Args:
+            resolution: (str) resolution of a file, e.g. '1080p', or None.
+        Returns:
+            The destination dir for the resolution, 'SD' if the resolution is
+            unknown, or 'default' if the resolution is not configured.
+        """
+        try:
+            return self.destination_dirs[resolution or 'SD']
+        except KeyError:
+            return self.destination_dirs['default']
+
+    def transfer_mode(self, path):
+        """Get the transfer mode for a destination path.
+
+        Args:
+            path: (str, utf-8) destination path of a file.
+        Returns:
+            The transfer mode of the deepest destination dir containing the
+            path, or the default mode.
+        """
+        path = os.path.normpath(path)
+        dirs = [d for d in self.transfer_modes if d != 'default'
+            and (path == d or path.startswith(d.rstrip(os.sep) + os.sep))]
+        return self.transfer_modes[max(dirs, key=len)] if dirs else self.transfer_modes['default']
+
+    def min_filesize_for(self, resolution):
+        """Get the minimum filesize for a resolution.
+
+        Args:
+            resolution: (str) resolution of a file, e.g. '1080p', or None.
+        Returns:
+            int: The minimum filesize in bytes, or default if the resolution
+                 could not be determined.
+        """
+        if resolution in ('720p', '1080p', '2160p'):
+            return self.min_filesize.get(resolution, self.min_filesize['default'])
+        elif resolution is not None and resolution.lower() in ('sd', 'sdtv'):
+            return self.min_filesize.get('SD', self.min_filesize['default'])
+        else:
+            return self.min_filesize['default']
+
 class Config(object):
     """Main class for handling app options.
     """
@@ -154,6 +294,15 @@ class Config(object):
             dest="safe_copy",
             help='Force files on the same partition to be copied and verified')
 
+        # --verify
+        # This option will verify copied files using a checksum computed while copying.
+        parser.add_argument(
+            '--verify',
+            action="store_true",
+            default=self._defaults.verify_copies,
+            dest="verify_copies",
+            help='Verify copied files against a checksum computed while copying')
+
         # -m, --move
         # This option will attempt to force move behavior for folders that appear to be (but are not) on different partitions.
         parser.add_argument(
@@ -225,6 +374,45 @@ class Config(object):
             dest="force_overwrite",
             help=('Forcibly overwrite any file (or matching files inside a film folder) with the same name, \regardless of size difference)'))
 
+        # --plan
+        # This option writes the decisions for every film to a plan, instead of moving them.
+        parser.add_argument(
+            '--plan',
+            action="store",
+            default=self._defaults.plan,
+            dest="plan",
+            type=str,
+            help='Write the plan for every film to a JSON file, without moving anything (implies --test)')
+
+        # --apply
+        # This option applies a plan written by --plan.
+        parser.add_argument(
+            '--apply',
+            action="store",
+            default=self._defaults.apply,
+            dest="apply",
+            type=str,
+            help='Apply a plan written by --plan, without looking up films again')
+
+        # -w, --watch
+        # This option keeps the app running, and processes new films as they arrive in the source dirs.
+        parser.add_argument(
+            '-w',
+            '--watch',
+            action="store_true",
+            default=self._defaults.watch,
+            dest="watch",
+            help='Keep running, and process new films in the source dir(s) as they arrive')
+
+        # --submit
+        # This option sends the source dirs to an instance running in watch mode, if there is one.
+        parser.add_argument(
+            '--submit',
+            action="store_true",
+            default=self._defaults.submit,
+            dest="submit",
+            help='Send the source dir(s) to an instance running in watch mode, instead of processing them here')
+
         # --source
         # This option overrides the source dirs configured in config.yaml.
         parser.add_argument(
@@ -281,6 +469,13 @@ class Config(object):
         # Normalize the paths in source_dirs and remove duplicates.
         self._defaults.source_dirs = list(set([os.path.normpath(d) for d in self._defaults.source_dirs]))
 
+        # Writing a plan must not change anything on disk, and applying one
+        # must not prompt for decisions that were already made.
+        if self._defaults.plan:
+            self._defaults.test = True
+        if self._defaults.apply:
+            self._defaults.interactive = False
+
         # Create placeholder var for mock inputs in interactive mode.
         self._defaults.mock_input = None
 
@@ -299,6 +494,24 @@ class Config(object):
         for k, v in self._defaults.items():
             setattr(self, k, AttrMap(v) if isinstance(v, dict) else v)
         del self._defaults
+
+        # Build the derived snapshot from the loaded options.
+        self._derived = Derived(self)
+
+    def __setattr__(self, name, value):
+        """Invalidate the derived snapshot when an option it depends on is reassigned.
+        """
+        super(Config, self).__setattr__(name, value)
+        if name in Derived.sources:
+            self.__dict__['_derived'] = None
+
+    @property
+    def derived(self):
+        """An immutable Derived snapshot of lookup structures, rebuilt as needed.
+        """
+        if self.__dict__.get('_derived') is None:
+            self._derived = Derived(self)
+        return self._derived
     
     def reload(self):
         """Reload config from config.yaml.
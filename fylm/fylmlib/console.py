@@ -29,6 +29,7 @@ import os
 import re
 import sys
 import itertools
+import threading
 
 from colors import color
 
@@ -41,6 +42,11 @@ import fylmlib.formatter as formatter
 import fylmlib.progress as progress
 from fylmlib.enums import Should
 
+# Thread-local output sink, used to keep each film's output together when
+# films are processed concurrently, and function that also receives each
+# line of plain text output printed by the thread.
+_local = threading.local()
+
 class console(object):
     """Main class for console output methods.
 
@@ -72,6 +78,9 @@ class console(object):
         # Style
         self._style = []
 
+        # Function that writes the output to the log
+        self._log = log.info
+
         # Inject ANSI helper functions
         for c in vars(ansi):
             self._colorizer(c)
@@ -115,12 +124,23 @@ class console(object):
         return self
 
     def print(self, should_log=True):
+        # If output for the current thread is being captured, and cannot be
+        # printed yet, the sink holds onto it and prints it later.
+        sink = getattr(_local, 'sink', None)
+        if sink is not None and sink.defer(self, should_log):
+            return
+        self.output(should_log)
+
+    def output(self, should_log=True):
         if should_log:
-            log.info(self._pltxt.get())
+            self._log(self._pltxt.get())
         if config.plaintext:
             print(patterns.ansi_escape.sub('', self._pltxt.get()))
         else:
             self._fmtxt.output()
+        tee = getattr(_local, 'tee', None)
+        if tee is not None:
+            tee(patterns.ansi_escape.sub('', self._pltxt.get()))
 
     """Helper methods for console class.
     """
@@ -345,12 +365,54 @@ class console(object):
         ).print()
 
     def print_copy_progress_bar(self, copied, total):
-        """Print progress bar to terminal.
+        """Print progress bar to terminal. If output is held by a sink that
+        tracks progress, the progress is sent to it instead.
         """
-        if not config.plaintext:
+        sink = getattr(_local, 'sink', None)
+        if sink is not None and hasattr(sink, 'progress'):
+            sink.progress(copied, total)
+        if not config.plaintext and console.is_live():
             print('      ' + progress.progress_bar(100 * copied / total), end='\r')
             sys.stdout.flush()
 
+    @classmethod
+    def capture(cls, sink):
+        """Send output printed by the current thread to a sink, or stop
+        capturing if sink is None.
+
+        Args:
+            sink: An object with a defer(console, should_log) method, which
+                  returns True if it will print the output later, or False
+                  if it should be printed now.
+        """
+        _local.sink = sink
+
+    @classmethod
+    def tee(cls, func):
+        """Send a copy of the output printed by the current thread, as plain
+        text, to a function, or stop sending it if func is None. Threads that
+        print on behalf of the current thread (e.g. pipeline workers) should
+        be given the same function, from get_tee().
+
+        Args:
+            func: A function that takes a line of output.
+        """
+        _local.tee = func
+
+    @classmethod
+    def get_tee(cls):
+        """Get the function that receives the current thread's output, if any.
+        """
+        return getattr(_local, 'tee', None)
+
+    @classmethod
+    def is_live(cls):
+        """Returns True if output printed by the current thread is printed
+        immediately, rather than held by a sink.
+        """
+        sink = getattr(_local, 'sink', None)
+        return sink is None or sink.live
+
     @classmethod
     def get_input(cls, prompt):
         """Prompt the user for input
@@ -376,8 +438,10 @@ class console(object):
             s: (str, utf-8) String to print
         """
         if config.debug is True:
-            log.debug(s)
-            console().bold().debug(s).print()
+            # Logged when printed, so it stays with the rest of the output for the current film.
+            c = console().bold().debug(s)
+            c._log = log.debug
+            c.print()
 
     @classmethod
     def error(cls, s, x=Exception):
@@ -387,7 +451,8 @@ class console(object):
             s: (str, utf-8) String to print
             x: (Exception)
         """
-        log.error(s)
-        console().bold().error(s).print()
+        c = console().bold().error(s)
+        c._log = log.error
+        c.print()
         if x:
             x(s)
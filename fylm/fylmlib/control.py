@@ -0,0 +1,220 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local control socket for Fylm.
+
+This module lets a running Fylm instance (in watch mode) accept paths to
+process over a Unix domain socket, and lets a separate invocation submit
+its --source paths to it, so that post-processing scripts do not pay for
+loading the existing films for every film.
+
+Messages are sent as one JSON object per line. The client sends:
+    {"sources": [path, ...]}
+and the server replies with each line of output, then the result:
+    {"line": text}
+    {"done": true, "count": int}
+
+    control: the main class exported by this module.
+    Job: paths submitted to be processed.
+"""
+
+from __future__ import unicode_literals, print_function
+from builtins import *
+
+import os
+import json
+import socket
+import threading
+import socketserver
+from queue import Queue
+
+import fylmlib.config as config
+from fylmlib.console import console
+
+class Job(object):
+    """Paths submitted through the control socket, to be processed by the
+    watch loop.
+
+    Attributes:
+        paths:      [str] paths to process.
+
+        lines:      (Queue) lines of output, followed by None when done.
+
+        count:      (int) number of films moved, once done.
+    """
+    def __init__(self, paths):
+        self.paths = paths
+        self.lines = Queue()
+        self.count = 0
+
+    def output(self, line):
+        self.lines.put(line)
+
+    def finish(self, count):
+        self.count = count
+        self.lines.put(None)
+
+class control:
+    """Main class for the control socket server and client.
+
+    All methods are class methods, thus this class should never be instantiated.
+    """
+
+    # Seconds to wait to connect to the server before processing locally.
+    timeout = 2
+
+    @classmethod
+    def path(cls) -> str:
+        """Path to the control socket, alongside the log unless configured.
+        """
+        return config.control_socket or f'{config.log_path or ""}fylm.sock'
+
+    @classmethod
+    def serve(cls, submit):
+        """Start listening on the control socket in a background thread.
+
+        Args:
+            submit: (function) called with each Job to be processed.
+        Returns:
+            The server, or None if the socket could not be created.
+        """
+        path = cls.path()
+
+        # Remove a socket left behind by an instance that did not exit cleanly,
+        # but not one that another instance is still listening on.
+        if os.path.exists(path):
+            if cls._connect() is not None:
+                console().yellow(f"Another instance is already listening on '{path}'").print()
+                return None
+            os.remove(path)
+
+        # Only the user running this instance may connect, since submitted
+        # paths are moved with its permissions.
+        umask = os.umask(0o177)
+        try:
+            server = _Server(path, _Handler)
+        except (IOError, OSError) as e:
+            console().yellow(f"Could not listen on '{path}' ({e})").print()
+            return None
+        finally:
+            os.umask(umask)
+
+        server.submit = submit
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        console.debug(f"Listening for submitted paths on '{path}'")
+        return server
+
+    @classmethod
+    def submit(cls, paths) -> int:
+        """Submit paths to a running instance, and print its output as it is
+        processed.
+
+        Args:
+            paths: [str] paths to process.
+        Returns:
+            The number of films moved, or None if no instance is running, in
+            which case the paths should be processed locally.
+        """
+        sock = cls._connect()
+        if sock is None:
+            console.debug(f"No instance is listening on '{cls.path()}', processing locally")
+            return None
+
+        with sock, sock.makefile('rwb') as f:
+            f.write(json.dumps({'sources': [os.path.abspath(p) for p in paths]}).encode('utf-8') + b'\n')
+            f.flush()
+            for raw in f:
+                message = json.loads(raw.decode('utf-8'))
+                if 'line' in message:
+                    print(message['line'])
+                elif message.get('done'):
+                    return message['count']
+                elif 'error' in message:
+                    console().red(message['error']).print()
+                    return 0
+        return 0
+
+    @classmethod
+    def _connect(cls):
+        """Connect to the control socket.
+
+        Returns:
+            A connected socket, or None if no instance is listening.
+        """
+        if not hasattr(socket, 'AF_UNIX') or not os.path.exists(cls.path()):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(cls.timeout)
+        try:
+            sock.connect(cls.path())
+        except (IOError, OSError):
+            sock.close()
+            return None
+        sock.settimeout(None)
+        return sock
+
+def _in_source_dirs(path) -> bool:
+    """True if path is one of the source dirs, or inside one of them.
+    """
+    path = os.path.realpath(path)
+    for src in config.source_dirs:
+        src = os.path.realpath(src)
+        if os.path.commonpath([path, src]) == src:
+            return True
+    return False
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Handles a single submission: reads the paths, queues them, and streams
+    back the output until they are processed.
+    """
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            paths = [os.path.normpath(p) for p in request['sources']]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._send({'error': 'Invalid request'})
+            return
+
+        missing = [p for p in paths if not os.path.exists(p)]
+        if len(missing) > 0:
+            self._send({'error': f"'{missing[0]}' does not exist"})
+            return
+
+        # Only films in this instance's source dirs may be processed.
+        outside = [p for p in paths if not _in_source_dirs(p)]
+        if len(outside) > 0:
+            self._send({'error': f"'{outside[0]}' is not in a source dir"})
+            return
+
+        job = Job(paths)
+        self.server.submit(job)
+
+        connected = True
+        for line in iter(job.lines.get, None):
+            # Keep draining output if the client goes away, so the job can finish.
+            connected = connected and self._send({'line': line})
+        if connected:
+            self._send({'done': True, 'count': job.count})
+
+    def _send(self, message) -> bool:
+        try:
+            self.wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+            self.wfile.flush()
+            return True
+        except (IOError, OSError):
+            return False
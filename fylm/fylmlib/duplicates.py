@@ -16,6 +16,9 @@
 """Duplicate handling for films.
 
 This module handles all the duplicate checking and handling logic for Fylm.
+
+    duplicates: the main class exported by this module.
+    Decision: a memoized comparison between an incoming file and a duplicate.
 """
 from __future__ import unicode_literals, print_function
 from builtins import *
@@ -28,9 +31,46 @@ from fylmlib.console import console
 from fylmlib.film import Film
 import fylmlib.compare as compare
 import fylmlib.operations as ops
+from fylmlib.journal import journal
 from fylmlib.enums import Should
 from fylmlib.enums import ComparisonResult
 
+class Decision(object):
+    """A memoized comparison between an incoming video file and one of its
+    duplicates. A film's decision matrix holds one Decision for each pair of
+    video file and duplicate, so that the comparisons are only computed once.
+
+    Attributes:
+        current:        The incoming Film.File.
+
+        duplicate:      The existing duplicate Film.File.
+
+        should:         Should enum value indicating how to handle the duplicate.
+
+        reason:         The reason for the decision, or an empty string.
+
+        resolution:     ComparisonResult of the current file's resolution to the
+                        duplicate's.
+
+        quality:        ComparisonResult of the current file's quality to the
+                        duplicate's.
+
+        is_exact:       True if the duplicate is an exact (quality) match for
+                        the current file.
+
+        is_identical:   True if the duplicate's contents are byte-identical to
+                        the current file's.
+    """
+    def __init__(self, current: Film.File, duplicate: Film.File):
+        self.current = current
+        self.duplicate = duplicate
+        self.resolution = compare.resolution(current, duplicate)
+        self.quality = compare.quality(current, duplicate)
+        self.is_exact = (self.quality == ComparisonResult.EQUAL 
+            and compare.is_duplicate(current.parent_film, duplicate.parent_film))
+        self.is_identical = compare.is_same_content(current, duplicate)
+        (self.should, self.reason) = duplicates._should(self)
+
 class duplicates:
     """Class for handling duplicate checking and governance.
 
@@ -88,18 +128,36 @@ class duplicates:
         duplicate_videos = list(itertools.chain(*[d.video_files for d in duplicates]))
         console.debug(f'Total duplicate copies of this film found: {len(duplicate_videos)}')
 
+        # Build the decision matrix once for every pair of video file and duplicate.
+        matrix = {}
         for v in film.video_files:
             for d in duplicate_videos:
+                decision = matrix[(id(v), id(d))] = cls._mark(Decision(v, d))
                 # Mark each duplicate in the record
-                if cls.should(v, d) == Should.IGNORE:
+                if decision.should == Should.IGNORE:
                     film.ignore_reason = "Not an upgrade for existing version"
 
         # Sort so that ignores are first, so console can skip printing the rest
         sort_order = [Should.IGNORE, Should.UPGRADE, Should.KEEP_BOTH]
         duplicate_videos = [d for x in sort_order for d in duplicate_videos if d.duplicate == x]
 
-        # Reverse the order in interactive mode and return
-        return duplicate_videos if not config.interactive else duplicate_videos[::-1]
+        # Reverse the order in interactive mode
+        duplicate_videos = duplicate_videos if not config.interactive else duplicate_videos[::-1]
+
+        # Store the decision matrix in the same order as the duplicates, and return
+        film._duplicate_decisions = [matrix[(id(v), id(d))] for v in film.video_files for d in duplicate_videos]
+        return duplicate_videos
+
+    @classmethod
+    def decide(cls, film: Film) -> [Decision]:
+        """Builds the decision matrix for a film and its duplicates.
+
+        Args:
+            film: (Film) a film to compare to its duplicates.
+        Returns:
+            list: [Decision] for each pair of video file and duplicate file.
+        """
+        return [cls._mark(Decision(v, d)) for v in film.video_files for d in film.duplicate_files]
 
     @classmethod
     def find_exact(cls, film: Film) -> [Film.File]:
@@ -118,7 +176,7 @@ class duplicates:
         # or quality could be missing from a duplicate's filename, by checking these properties
         # we can prevent data loss. Only YOU can prevent data loss!
 
-        return [d for v in film.video_files for d in film.duplicate_files if compare.is_exact_duplicate(v, d)]
+        return [x.duplicate for x in film.duplicate_decisions if x.is_exact]
 
     @classmethod
     def find_lower_quality(cls, film: Film) -> [Film.File]:
@@ -133,8 +191,8 @@ class duplicates:
         """
 
         # Compares video files to duplicate files and returns all duplicates where 
-        # the duplicate (d) is lower quality than the current film's video files (v).
-        return [d for v in film.video_files for d in film.duplicate_files if compare.quality(d, v) == ComparisonResult.LOWER]
+        # the duplicate is lower quality than the current film's video files.
+        return [x.duplicate for x in film.duplicate_decisions if x.quality == ComparisonResult.HIGHER]
 
     @classmethod
     def find_upgradable(cls, film: Film):
@@ -145,7 +203,7 @@ class duplicates:
         """
 
         # Loop through each duplicate that should be replaced.
-        return [d for v in film.video_files for d in film.duplicate_files if cls.should(v, d) == Should.UPGRADE]
+        return [x.duplicate for x in film.duplicate_decisions if x.should == Should.UPGRADE]
 
     @classmethod
     def should(cls, current: Film.File, duplicate: Film.File) -> Should:
@@ -169,10 +227,30 @@ class duplicates:
         Returns:
             Enum, one of 'Should.UPGRADE', 'Should.IGNORE', or 'Should.KEEP_BOTH'.
         """
+        return cls._mark(Decision(current, duplicate)).should
+
+    @classmethod
+    def _should(cls, decision: Decision) -> (Should, str):
+        """Determines how to handle a duplicate from its memoized comparisons.
+        See should() for details.
+
+        Args:
+            decision (Decision): Comparison of the current file and a duplicate.
+        Returns:
+            A tuple of (Should, reason).
+        """
+
+        current = decision.current
+        duplicate = decision.duplicate
 
         # If duplicate replacing is disabled, don't replace.
         if config.duplicates.automatic_upgrading is False:
-            return cls._mark(duplicate, Should.IGNORE)
+            return (Should.IGNORE, '')
+
+        # If the duplicate is a byte-identical copy, there is nothing to gain
+        # by moving the current file, however the two are named.
+        if decision.is_identical:
+            return (Should.IGNORE, 'Identical file')
 
         # If the duplicate is a path and not a film, we need to load it.
         # from fylmlib.film import Film
@@ -196,63 +274,62 @@ class duplicates:
 
         # If the resolutions don't match and the current resolution is in the
         # duplicate's upgrade table, upgrade, otherwise keep both.
-        if compare.resolution(current, duplicate) != ComparisonResult.EQUAL:
+        if decision.resolution != ComparisonResult.EQUAL:
             if current.resolution in config.duplicates.upgrade_table[duplicate.resolution or 'SD']:
                 # Duplicate is a lower resolution and is in the upgrade table
-                return cls._mark(duplicate, Should.UPGRADE, 'Lower resolution')
+                return (Should.UPGRADE, 'Lower resolution')
             else:
                 # Duplicate is a different resolution, but is not in the upgrade table
                 # so we're going to keep both copies.
-                return cls._mark(duplicate, Should.KEEP_BOTH, 'Different resolutions')
-        elif compare.resolution(current, duplicate) == ComparisonResult.LOWER:
+                return (Should.KEEP_BOTH, 'Different resolutions')
+        elif decision.resolution == ComparisonResult.LOWER:
             # Duplicate is a higher resolution than the current file 
             ignore_reason = 'Better resolution'
 
         # If the resolutions match, we need to do some additional comparisons.
-        if compare.resolution(current, duplicate) == ComparisonResult.EQUAL:
+        if decision.resolution == ComparisonResult.EQUAL:
             # For now, HDR will always be kept alongside SDR copies, so if one is an HDR, 
             # we will automatically keep both.
             if current.is_hdr != duplicate.is_hdr:
-                return cls._mark(duplicate, Should.KEEP_BOTH, 'HDR' if duplicate.is_hdr else 'Not HDR')
+                return (Should.KEEP_BOTH, 'HDR' if duplicate.is_hdr else 'Not HDR')
 
             # If editions don't match, keep both unless the ignore_edition flag is enabled
             # Console should show a warning but the duplicate will remain intact.
             if current.edition != duplicate.edition and not config.duplicates.ignore_edition:
-                return cls._mark(duplicate, Should.KEEP_BOTH, 'Different editions')
+                return (Should.KEEP_BOTH, 'Different editions')
 
             # If the current is a better quality or proper, replace the same resolutions
             # This heuristic is quite complex, see code comments in compare.quality()
-            if compare.quality(current, duplicate) == ComparisonResult.HIGHER:
-                return cls._mark(duplicate, Should.UPGRADE, 'Lower quality')
+            if decision.quality == ComparisonResult.HIGHER:
+                return (Should.UPGRADE, 'Lower quality')
             else:
                 ignore_reason = 'Same or better quality'
 
             # If the current file is of the same quality and the file size is larger, upgrade
             if (config.duplicates.automatic_upgrading is True and current.size > (duplicate.size or 0)):
-                return cls._mark(duplicate, Should.UPGRADE)
+                return (Should.UPGRADE, '')
             elif current.size == (duplicate.size or 0):
                 ignore_reason = "Same quality"
 
         # If up to this point we can't determine if we should upgrade or keep both, ignore the current file
         # because it cannot be safely moved without risk of data loss. Chances are at this point everything
         # is the same, except the current file is the same or smaller size than the duplicate.        
-        return cls._mark(duplicate, Should.IGNORE, ignore_reason)
+        return (Should.IGNORE, ignore_reason)
 
     @classmethod
-    def _mark(cls, d: Film.File, should: Should, reason: str='') -> Should:
-        """Marks a duplicate file with the result of a should() call,
-        then returns the original should() value. This can appear to be a little
-        backwards, but if it is set to Should.UPGRADE, that means it is marked for upgrade.
+    def _mark(cls, decision: Decision) -> Decision:
+        """Marks a duplicate file with the result of a decision, then returns
+        the decision. This can appear to be a little backwards, but if it is
+        set to Should.UPGRADE, that means it is marked for upgrade.
         
         Args:
-            current (Film.File): The current Film (file) object.
-            duplicate (Film.File): Verified duplicate file that the current file will be compared to.
+            decision (Decision): Comparison of the current file and a duplicate.
         Returns:
-            Enum, one of 'Should.UPGRADE', 'Should.IGNORE', or 'Should.KEEP_BOTH'.
+            The original decision.
         """
-        d.duplicate = should
-        d.upgrade_reason = reason
-        return should
+        decision.duplicate.duplicate = decision.should
+        decision.duplicate.upgrade_reason = decision.reason
+        return decision
 
     @classmethod
     def rename_unwanted(cls, film: Film, unwanted = None):
@@ -276,6 +353,7 @@ class duplicates:
                 # Skip if it's already been renamed (edge case for when
                 # there are multiple copies of the same film being moved)
                 continue
+            journal.record(journal.tx(film), 'dup', path=d.source_path)
             ops.fileops.rename(d.source_path, f'{os.path.basename(d.source_path)}.dup')
 
     @classmethod
@@ -297,8 +375,9 @@ class duplicates:
         # Delete empty duplicate container folders
         cls.delete_leftover_folders(film)
 
-        # Remove deleted duplicates from the film object
+        # Remove deleted duplicates from the film object, and invalidate its decision matrix
         film._duplicate_files = list(filter(lambda d: os.path.exists(d.source_path) or os.path.exists(f'{d.source_path}.dup'), film._duplicate_files))
+        film._duplicate_decisions = None
 
     @classmethod
     def delete_leftover_folders(cls, film: Film):
@@ -312,8 +391,10 @@ class duplicates:
                         might have left behind empty folders.
         """
 
-        # Delete empty duplicate container folders
-        for dup_film in [f.parent_film for f in film.duplicate_files]:
-            if dup_film.is_folder and len(ops.dirops.find_deep(dup_film.source_path)) == 0:
+        # Delete empty duplicate container folders, checking each folder only once
+        # even if it contained more than one duplicate.
+        folders = set(f.parent_film.source_path for f in film.duplicate_files if f.parent_film.is_folder)
+        for folder in sorted(folders):
+            if len(ops.dirops.find_deep(folder)) == 0:
                 # Delete the parent film dir and any hidden contents if it is less than 1 KB.
-                ops.dirops.delete_dir_and_contents(dup_film.source_path, max_size=1000)
+                ops.dirops.delete_dir_and_contents(folder, max_size=1000)
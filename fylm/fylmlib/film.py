@@ -25,10 +25,10 @@ import os
 import re
 import itertools
 
-from pymediainfo import MediaInfo
-
 import fylmlib.config as config
 from fylmlib.parser import parser
+from fylmlib.probe import probe
+import fylmlib.patterns as patterns
 import fylmlib.formatter as formatter
 import fylmlib.tmdb as tmdb
 import fylmlib.operations as ops
@@ -125,9 +125,18 @@ class Film:
     def __init__(self, source_path):
         self.source_path = source_path
 
+        # Internal setter for `title`.
+        self._title = None
+
+        # Internal cache for `title_the`, derived from `title`.
+        self._title_the = None
+
         # Internal setter for `duplicates`.
         self._duplicate_files = None
 
+        # Internal cache for `duplicate_decisions`, derived from `duplicate_files`.
+        self._duplicate_decisions = None
+
         # Internal setter for `metadata`.
         self._metadata = None
 
@@ -137,6 +146,9 @@ class Film:
         # Internal setter for `valid_files`.
         self._all_valid_files = None
 
+        # Internal cache of invalid files found when searching for `all_valid_files`.
+        self._invalid_files = None
+
         # Internal setter for (immutable) `original_path`.
         # Do not change even if the file is renamed, moved, or copied.
         self._original_path = source_path
@@ -161,6 +173,17 @@ class Film:
         self.ignore_reason = None
         self.should_ignore
 
+    @property
+    def source_path(self):
+        return self._source_path
+
+    @source_path.setter
+    def source_path(self, value):
+        self._source_path = value
+
+        # Invalidate fields derived from the basename.
+        self._is_tv_show = None
+
     @property
     def original_path(self):
         return self._original_path
@@ -175,16 +198,31 @@ class Film:
             self._size = ops.size(self.source_path)
         return self._size
 
+    @property
+    def title(self):
+        return self._title
+
+    @title.setter
+    def title(self, value):
+        self._title = value
+
+        # Invalidate fields derived from the title.
+        self._title_the = None
+
     @property
     def title_the(self):
-        if re.search(r'(^the\b|, the)', self.title, re.I):
-            return f'{formatter.strip_the(self.title)}, The'
-        else:
-            return self.title
+        if self._title_the is None and self.title is not None:
+            if patterns.title_the.search(self.title):
+                self._title_the = f'{formatter.strip_the(self.title)}, The'
+            else:
+                self._title_the = self.title
+        return self._title_the
 
     @property
     def is_tv_show(self):
-        return bool(re.search(r"\bS\d{2}(E\d{2})?\b", self.original_basename, re.I))
+        if self._is_tv_show is None:
+            self._is_tv_show = bool(patterns.tv_show.search(self.original_basename))
+        return self._is_tv_show
 
     @property
     def is_file(self):
@@ -207,13 +245,23 @@ class Film:
                 # It's a file, we can just return an array with the file as its only value
                 self._all_valid_files = [Film.File(self.source_path, self)]
             else:
-                # Get all valid files
-                self._all_valid_files = list(Film.File(path, self) for path in ops.dirops.get_valid_files(self.source_path))
+                # Get all valid files, and keep the invalid files for cleaning up later
+                (valid_files, self._invalid_files) = ops.dirops.get_files(self.source_path)
+                self._all_valid_files = list(Film.File(path, self) for path in valid_files)
                 # Sort by size, inversely so that the largest file is first in the list
                 self._all_valid_files.sort(key=lambda f: f.size, reverse=True)
 
         return self._all_valid_files
 
+    @property
+    def invalid_files(self) -> [str]:
+        """Paths of the invalid (unwanted) files found in the film's folder
+        when it was searched for valid files, or None if the film is a file.
+        """
+        if self._all_valid_files is None:
+            self.all_valid_files
+        return self._invalid_files
+
     @property
     def video_files(self) -> ['Film.File']:
         """For files that have already been moved and renamed (i.e., exist on
@@ -269,6 +317,24 @@ class Film:
         """
         return list(filter(lambda d: os.path.exists(d.source_path), self.duplicate_files))
 
+    @property
+    def duplicate_decisions(self) -> ['Decision']:
+        """The memoized decision matrix comparing each video file to each
+        duplicate file. It is built when duplicates are found, and rebuilt
+        if it is invalidated (set to None) when the duplicates change.
+
+        Returns:
+            An array of duplicates.Decision objects.
+        """
+        # Import duplicates here to avoid circular imports.
+        from fylmlib.duplicates import duplicates
+
+        # Accessing duplicate_files first ensures duplicates.find() has run.
+        if self.duplicate_files is not None and self._duplicate_decisions is None:
+            self._duplicate_decisions = duplicates.decide(self)
+
+        return self._duplicate_decisions
+
     @property
     def new_basename(self):
         r"""Build a new path name from the specified renaming pattern.
@@ -301,10 +367,7 @@ class Film:
         if config.rename_only is True:
             root_dst_folder = os.path.dirname(self.source_path)
         else:
-            try:
-                root_dst_folder = config.destination_dirs[self.primary_file.resolution] if self.primary_file.resolution else config.destination_dirs['SD']
-            except KeyError:
-                root_dst_folder = config.destination_dirs['default']
+            root_dst_folder = config.derived.destination_dir(self.primary_file.resolution)
         film_folder = formatter.build_new_basename(self.primary_file, 'folder') if config.use_folders else ''
         return os.path.normpath(os.path.join(root_dst_folder, film_folder))
 
@@ -432,6 +495,9 @@ class Film:
 
             metadata:           Media metadata derived from libmediainfo
 
+            fingerprint:        Sampled content hash of the file, used to detect
+                                byte-identical copies.
+
             new_filename:       New filename generated using the defined templating pattern
                                 in config.rename_pattern.file.
 
@@ -548,13 +614,13 @@ class Film:
         @property
         def metadata(self):
             if not self._metadata and self.is_video:
-                media_info = MediaInfo.parse(self.source_path, 
-                    library_file=os.path.join(os.path.abspath(os.path.dirname(__file__)), 'libmediainfo.0.dylib'))
-                for track in media_info.tracks:
-                    if track.track_type == 'Video':
-                        self._metadata = track
+                self._metadata = probe.metadata(self.source_path)
             return self._metadata
 
+        @property
+        def fingerprint(self):
+            return probe.fingerprint(self.source_path)
+
         @property
         def has_valid_ext(self):
             return ops.fileops.has_valid_ext(self.source_path) if self.is_file else False
@@ -565,7 +631,7 @@ class Film:
 
         @property
         def is_video(self):
-            return any([self.ext in [x.replace('.', '') for x in config.video_exts]])
+            return f'.{self.ext}' in config.derived.video_exts
 
         @property
         def is_subtitle(self):
@@ -620,10 +686,7 @@ class Film:
             if config.rename_only is True:
                 dst = os.path.dirname(self.source_path)
             else:
-                try:
-                    dst = config.destination_dirs[self.resolution] if self.resolution else config.destination_dirs['SD']
-                except KeyError:
-                    dst = config.destination_dirs['default']
+                dst = config.derived.destination_dir(self.resolution)
             return os.path.normpath(os.path.join(dst, self.new_foldername)) if config.use_folders else dst
 
         @property
@@ -0,0 +1,243 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Write-ahead journal of file operations for Fylm.
+
+This module records each step of moving a film (renaming duplicates to .dup,
+and moving each file) before it is performed, so that if Fylm is interrupted,
+only the journaled operations need to be rolled forward or back on the next
+run, instead of searching the library for stray files. Each process writes its
+own journal, and holds a lock on it while running, so that other processes
+sharing the same log_path only recover the journals of processes that exited.
+
+    journal: the main class exported by this module.
+"""
+
+from __future__ import unicode_literals, print_function
+from builtins import *
+
+import os
+import glob
+import json
+import uuid
+import socket
+import threading
+try:
+    import fcntl
+except ImportError:
+    # File locks are not available on Windows, so journals are recovered
+    # regardless of whether the process that wrote them is still running.
+    fcntl = None
+
+import fylmlib.config as config
+import fylmlib.formatter as formatter
+from fylmlib.console import console
+
+class journal:
+    """Main class for journaling and recovering file operations.
+
+    Each film is a transaction made up of steps, appended to the journal as
+    one JSON object per line:
+        dup:    {path} is about to be renamed to {path}.dup
+        move:   {src} is about to be moved to {dst}
+        moved:  {src} was moved to {dst}
+        commit: all of the transaction's steps are complete
+
+    All methods are class methods, thus this class should never be instantiated.
+    """
+
+    # Unique id of this process, used to name its journal.
+    owner = f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+    _lock = threading.Lock()
+
+    # This process's journal, opened and locked when the first step is recorded.
+    _file = None
+
+    # Transactions in this process's journal that have not been committed.
+    _uncommitted = set()
+
+    @classmethod
+    def path(cls):
+        """Path to this process's journal file, alongside the log.
+        """
+        return f'{config.log_path or ""}fylm.{cls.owner}.journal'
+
+    @classmethod
+    def tx(cls, film) -> str:
+        """Get the transaction id for a film, starting a new transaction
+        if it does not have one.
+
+        Args:
+            film: (Film) film whose operations are being journaled.
+        Returns:
+            A transaction id.
+        """
+        if getattr(film, '_journal_tx', None) is None:
+            film._journal_tx = uuid.uuid4().hex
+        return film._journal_tx
+
+    @classmethod
+    def record(cls, tx, step, **kwargs):
+        """Durably append a step to the journal. Does nothing in test mode, or
+        if tx is None.
+
+        Args:
+            tx: (str) transaction id.
+            step: (str) one of 'dup', 'move', 'moved', or 'commit'.
+            kwargs: paths for the step.
+        """
+        if config.test is True or tx is None:
+            return
+        entry = json.dumps(dict(tx=tx, step=step, **kwargs))
+        with cls._lock:
+            if cls._file is None:
+                cls._file = open(cls.path(), 'a')
+                if fcntl is not None:
+                    fcntl.flock(cls._file, fcntl.LOCK_EX)
+            cls._file.write(entry + '\n')
+            cls._file.flush()
+            os.fsync(cls._file.fileno())
+            if step == 'commit':
+                cls._uncommitted.discard(tx)
+            else:
+                cls._uncommitted.add(tx)
+
+    @classmethod
+    def commit(cls, film):
+        """Mark a film's transaction as complete, if it has one.
+
+        Args:
+            film: (Film) film whose operations are complete.
+        """
+        tx = getattr(film, '_journal_tx', None)
+        if tx is not None:
+            cls.record(tx, 'commit')
+            film._journal_tx = None
+
+    @classmethod
+    def close(cls):
+        """Close this process's journal when it exits. The journal is removed
+        if every transaction was committed, otherwise it is left to be
+        recovered by the next run.
+        """
+        with cls._lock:
+            if cls._file is None:
+                return
+            cls._file.close()
+            cls._file = None
+            if len(cls._uncommitted) == 0:
+                os.remove(cls.path())
+            cls._uncommitted = set()
+
+    @classmethod
+    def recover(cls) -> int:
+        """Roll forward or back every transaction that was not committed in the
+        journals of processes that are no longer running, then remove them.
+
+        A transaction whose moves all completed is rolled forward: the .dup
+        files it left behind are deleted, as they would have been. Otherwise,
+        it is rolled back: each .dup file is restored to its original name.
+        Partially copied files are kept, so that copying can be resumed, unless
+        their source no longer exists.
+
+        Returns:
+            The number of transactions recovered.
+        """
+        if config.test is True:
+            return 0
+
+        # Journals of older versions were shared by every process, as fylm.journal.
+        prefix = glob.escape(config.log_path or '')
+        paths = set(glob.glob(f'{prefix}fylm.*.journal') + glob.glob(f'{prefix}fylm.journal'))
+        paths.discard(cls.path())
+
+        recovered = 0
+        for path in sorted(paths):
+            try:
+                f = open(path, 'r')
+            except (IOError, OSError):
+                # Already recovered by another process.
+                continue
+            try:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except (IOError, OSError):
+                        console.debug(f"Skipping journal '{path}', which is still in use")
+                        continue
+                    # Another process may have recovered and removed it first.
+                    if not os.path.exists(path) or not os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                        continue
+                recovered += cls._recover(f)
+                os.remove(path)
+            finally:
+                f.close()
+
+        if recovered > 0:
+            console().yellow(f"\nRecovered {recovered} interrupted {formatter.pluralize('operation', recovered)}").print()
+
+        return recovered
+
+    @classmethod
+    def _recover(cls, f) -> int:
+        """Recover the transactions in a journal.
+
+        Args:
+            f: (file) open journal.
+        Returns:
+            The number of transactions recovered.
+        """
+
+        # Group steps by transaction, in the order they were started.
+        txs = {}
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The last line may be incomplete if writing it was interrupted.
+                continue
+            txs.setdefault(entry['tx'], []).append(entry)
+
+        recovered = 0
+        for tx, steps in txs.items():
+            if any(s['step'] == 'commit' for s in steps):
+                continue
+            recovered += 1
+
+            dups = [s['path'] for s in steps if s['step'] == 'dup']
+            moved = set((s['src'], s['dst']) for s in steps if s['step'] == 'moved')
+            moves = [(s['src'], s['dst']) for s in steps if s['step'] == 'move']
+
+            # A move whose destination exists and whose source does not completed,
+            # even if it was interrupted before it could be recorded.
+            incomplete = [(src, dst) for (src, dst) in moves if (src, dst) not in moved
+                and not (os.path.lexists(dst) and not os.path.exists(src))]
+
+            if len(moves) > 0 and len(incomplete) == 0:
+                console.debug(f'Rolling forward journaled transaction {tx}')
+                for path in dups:
+                    if os.path.exists(f'{path}.dup'):
+                        os.remove(f'{path}.dup')
+            else:
+                console.debug(f'Rolling back journaled transaction {tx}')
+                for (src, dst) in incomplete:
+                    if not os.path.exists(src) and os.path.exists(f'{dst}.partial~'):
+                        os.remove(f'{dst}.partial~')
+                for path in reversed(dups):
+                    if os.path.exists(f'{path}.dup') and not os.path.lexists(path):
+                        os.rename(f'{path}.dup', path)
+
+        return recovered
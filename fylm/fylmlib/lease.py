@@ -0,0 +1,216 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Lease files for coordinating multiple Fylm workers.
+
+This module lets several Fylm processes, on the same or different hosts,
+share the same source dirs (e.g. over NFS) without processing the same film
+twice. Before a film is processed, the worker claims it by creating a lease
+file next to it, which is renewed by a heartbeat while the film is being
+processed, and can be reclaimed by another worker once it expires.
+
+    lease: the main class exported by this module.
+"""
+
+from __future__ import unicode_literals, print_function
+from builtins import *
+
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+
+import fylmlib.config as config
+from fylmlib.console import console
+
+class lease:
+    """Main class for claiming films with lease files.
+
+    A lease is claimed by writing a uniquely named file, then hard linking it
+    to the lease path, which is atomic even on NFS: exactly one worker's link
+    succeeds. An expired lease is reclaimed by renaming it to a unique name
+    first, so that only one worker can reclaim it.
+
+    Expiry is based on the lease file's mtime, so the clocks of all workers
+    should be kept in sync (e.g. with NTP) to within a fraction of lease_ttl.
+
+    Leases are named after the inode of the film's file or folder, rather than
+    its name, so that a film renamed in place while it is being processed is
+    still claimed.
+
+    All methods are class methods, thus this class should never be instantiated.
+    """
+
+    # Name of the hidden dir in each source dir that holds its leases.
+    dirname = '.fylm-leases'
+
+    # Unique id of this worker.
+    owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+    # Leases held by this worker, mapped from the path of the film they claim.
+    _held = {}
+    _lock = threading.Lock()
+    _heartbeat = None
+
+    @classmethod
+    def path(cls, film_path) -> str:
+        """Path to the lease file for a film. Raises OSError if the film
+        does not exist.
+
+        Args:
+            film_path: (str, utf-8) path of a film in a source dir.
+        """
+        return os.path.join(os.path.dirname(film_path), cls.dirname, f'{os.stat(film_path).st_ino}.lease')
+
+    @classmethod
+    def acquire(cls, film_path) -> bool:
+        """Claim a film, so that no other worker will process it. Does nothing
+        (and always succeeds) if leases are disabled in config.
+
+        Args:
+            film_path: (str, utf-8) path of a film in a source dir.
+        Returns:
+            True if this worker now holds the lease, otherwise False.
+        """
+        if config.leases is not True:
+            return True
+
+        try:
+            path = cls.path(film_path)
+        except FileNotFoundError:
+            # Another worker renamed or moved the film since it was found.
+            return False
+
+        tmp = f'{path}.{uuid.uuid4().hex}'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, 'w') as f:
+                json.dump({'owner': cls.owner, 'path': film_path}, f)
+
+            # Try twice: if the first attempt finds an expired lease, it is
+            # reclaimed before trying again.
+            for _ in range(2):
+                try:
+                    os.link(tmp, path)
+                    break
+                except FileExistsError:
+                    if not cls._reclaim(path):
+                        console.debug(f"'{os.path.basename(film_path)}' is claimed by {cls._owner(path)}")
+                        return False
+            else:
+                return False
+        except (IOError, OSError) as e:
+            # If films cannot be claimed, it is not safe to process them.
+            console().yellow(f"Could not claim '{film_path}' ({e})").print()
+            return False
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        with cls._lock:
+            cls._held[film_path] = path
+        cls._start_heartbeat()
+        return True
+
+    @classmethod
+    def release(cls, film_path):
+        """Release a film's lease, if this worker holds it.
+
+        Args:
+            film_path: (str, utf-8) path of a film in a source dir.
+        """
+        with cls._lock:
+            path = cls._held.pop(film_path, None)
+        if path is None:
+            return
+        try:
+            if cls._owner(path) == cls.owner:
+                os.remove(path)
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            # The lease dir is only removed once it is empty.
+            pass
+
+    @classmethod
+    def renew(cls):
+        """Renew all of the leases held by this worker.
+        """
+        with cls._lock:
+            held = list(cls._held.values())
+        for path in held:
+            try:
+                os.utime(path)
+            except OSError as e:
+                console.debug(f"Could not renew lease '{path}' ({e})")
+
+    @classmethod
+    def _reclaim(cls, path) -> bool:
+        """Remove a lease if it has expired.
+
+        Returns:
+            True if the lease expired and was removed, otherwise False.
+        """
+        try:
+            owner = cls._owner(path)
+            if time.time() - os.stat(path).st_mtime < config.lease_ttl:
+                return False
+            stale = f'{path}.{uuid.uuid4().hex}.stale'
+            os.rename(path, stale)
+        except OSError:
+            # Another worker released or reclaimed it first, so try again.
+            return True
+
+        # The lease may have been renewed, or released and claimed again, after
+        # it was checked and before it was renamed. If so, give it back.
+        if cls._owner(stale) != owner or time.time() - os.stat(stale).st_mtime < config.lease_ttl:
+            try:
+                os.link(stale, path)
+            except OSError:
+                # Another worker has claimed the film since.
+                pass
+            os.remove(stale)
+            return False
+
+        console.debug(f"Reclaimed expired lease '{path}'")
+        os.remove(stale)
+        return True
+
+    @classmethod
+    def _owner(cls, path) -> str:
+        """Get the owner of a lease, or None if it cannot be read.
+        """
+        try:
+            with open(path, 'r') as f:
+                return json.load(f).get('owner')
+        except (IOError, OSError, ValueError):
+            return None
+
+    @classmethod
+    def _start_heartbeat(cls):
+        """Start renewing held leases in the background, if not already started.
+        """
+        with cls._lock:
+            if cls._heartbeat is not None:
+                return
+            cls._heartbeat = threading.Thread(target=cls._beat, daemon=True)
+        cls._heartbeat.start()
+
+    @classmethod
+    def _beat(cls):
+        while True:
+            time.sleep(max(config.lease_ttl / 3, 1))
+            cls.renew()
@@ -16,76 +16,76 @@
 """Notification handler for Fylm.
 
 This module is used to send notifications to various external integrations.
+Notifications are queued and sent in the background by a dispatcher thread,
+so that they never hold up processing or moving films. Films added to
+Pushover are collected and sent as a single digest, either at the end of
+each run, or every `notifications.batch_minutes`. Plex is asked to scan only
+the folders that films were moved to, once no new films have arrived for
+`plex.debounce` seconds.
 """
 
 from __future__ import unicode_literals, print_function
 from builtins import *
-try:
-    from urllib.parse import urljoin
-except ImportError:
-    from urlparse import urljoin
 import os
-import shutil
+import time
+import threading
+from queue import Queue, Empty, Full
 
 from plexapi.server import PlexServer
 from fylmlib.pushover import init, Client
 from colors import color
-import requests
 
 from fylmlib.pyfancy import *
 from fylmlib.ansi import ansi
 from fylmlib.log import log
 import fylmlib.config as config
+import fylmlib.formatter as formatter
 from fylmlib.console import console
+from fylmlib.posters import posters
 
-"""Notification handler for Fylm.
+# Notifications waiting to be sent, bounded by `notifications.backlog`.
+_queue = None
+_dispatcher = None
+_lock = threading.Lock()
 
-This module handles all external services notifications.
-Currently only Plex is supported, but Pushover is coming soon.
-"""
+# Films and folders taken from the queue by the dispatcher, until they are sent.
+_films = []
+_scans = set()
 
-def plex():
+# Seconds Plex is given to respond, and that a Pushover request is expected to take.
+_PLEX_TIMEOUT = 10
+_PUSHOVER_TIMEOUT = 30
+
+def plex(path=None):
     """Plex notification handler.
 
-    Notify Plex that it should check for updates.
+    Queue a request for Plex to scan a folder that has changed. Requests
+    queued before the next scan are combined, and each folder is only
+    scanned once.
+
+    Args:
+        path: (str, utf-8) folder a film was moved to. If None, the
+                           configured sections are scanned in full.
     """
 
     # Check if Plex notifications are enabled, and that we're not running in 
-    # quiet or rename modes.
+    # quiet or rename modes. No need to notify in test mode since there won't
+    # be any changes.
     if (config.plex.enabled is True 
         and config.quiet is False 
         and config.rename_only is False
         and config.test is False):
 
-        # Disable the log so that HTTP ops aren't printed to the log.
-        log.disable()
-        try:
-            # Create a connection to the Plex server
-            plex = PlexServer(baseurl=config.plex.baseurl, token=config.plex.token, timeout=10)
-        except Exception as e:
-            # If the connection fails, log the error and print a response to the console.
-            log.enable()
-            console().red(f'Could not connect to Plex server on {config.plex.baseurl}').print()
-            console.error(e)
-            return
-
-        console().white('\nUpdating plex...').print()
-
-        # If the connection was successful, tell Plex to update specified sections if running
-        # in live mode. No need to notify in test mode since there won't be any changes.
-        if not config.test:
-            for section in (plex.library.section(section) for section in config.plex.sections):
-                section.refresh()
-
-        console().green(' Done ✓\n').print()
-
-        # Re-enable logging when done.
-        log.enable()
+        _enqueue('plex', path)
 
 def pushover(film):
     """Pushover notification handler.
 
-    Notify Pushover that an action has been performed.
+    Queue a notification that a film has been added, to be sent in the next
+    digest.
+
+    Args:
+        film: (Film) film that was added.
     """
 
     # Check if Pushover notifications are enabled, and that we're not running in 
@@ -95,32 +95,242 @@ def pushover(film):
         and config.rename_only is False
         and config.test is False):
 
-        attachment = None
-        images_path = os.path.join(os.getcwd(), 'fylm/__images__')
-        if not os.path.exists(images_path):
-            os.makedirs(images_path)
+        # Start downloading the poster now, so that it is ready to send.
+        posters.prefetch([film.poster_path])
+
+        # Only keep what is needed to send the notification, so that the
+        # film itself isn't held on to by the queue.
+        _enqueue('pushover', {
+            'title': film.title,
+            'year': film.year,
+            'overview': film.overview or '',
+            'poster_path': film.poster_path
+        })
+
+def flush(timeout=0) -> bool:
+    """Send queued notifications. If waiting for them (e.g. before exiting),
+    everything is sent now. Otherwise, the dispatcher is only woken: Plex
+    scans are still debounced, and if `notifications.batch_minutes` is set,
+    the Pushover digest is still sent on its schedule.
+
+    Args:
+        timeout: (int) seconds to wait for them to be sent. 0 doesn't wait,
+                       and None waits until they have been sent.
+    Returns:
+        True if there was nothing to send, or everything was sent in time,
+        otherwise False.
+    """
+    if _queue is None:
+        return True
+    done = threading.Event()
+    try:
+        # If the backlog is full and we aren't waiting, queued notifications
+        # will be sent by the next flush instead.
+        _queue.put(('flush', (done, timeout != 0)), block=timeout != 0, timeout=timeout or None)
+    except Full:
+        return False
+    if timeout == 0:
+        return True
+    return done.wait(timeout)
+
+def flush_timeout() -> float:
+    """Seconds to wait for notifications to be sent before exiting: the
+    configured `notifications.flush_timeout`, or if it is not set, long enough
+    for both Plex and Pushover to use all of their retries.
+    """
+    if config.notifications.flush_timeout:
+        return config.notifications.flush_timeout
+    retries = config.notifications.retries
+    backoff = 2 ** retries - 1
+    attempt = _PLEX_TIMEOUT + _PUSHOVER_TIMEOUT + config.posters.timeout
+    return 2 * backoff + (retries + 1) * attempt
 
-        if film.poster_path:
-            url = urljoin('https://image.tmdb.org/t/p/w185/', film.poster_path)
-            img = os.path.join(images_path, film.poster_path)
-            response = requests.get(url, stream=True)
-            with open(img, 'wb') as f:
-                shutil.copyfileobj(response.raw, f)
-            attachment = ("image.jpg", open(img, "rb"), "image/jpeg")
+def unsent() -> [str]:
+    """Describe the notifications that have not been sent yet.
 
-        # Application API token/key, which can be found by selecting your app
-        # from https://pushover.net/apps and copying the key.
-        init(config.pushover.app_token)
+    Returns:
+        A list of descriptions, e.g. ['Pushover (Arrival (2016))'].
+    """
+    if _queue is None:
+        return []
+    with _queue.mutex:
+        queued = list(_queue.queue)
+    with _lock:
+        films = _films + [p for (kind, p) in queued if kind == 'pushover']
+        scans = _scans | set(p for (kind, p) in queued if kind == 'plex')
+    descriptions = []
+    if films:
+        titles = ', '.join(f"{f['title']} ({f['year']})" for f in films)
+        descriptions.append(f'Pushover ({titles})')
+    if scans:
+        descriptions.append(f"Plex scan of {len(scans)} {formatter.pluralize('folder', len(scans))}")
+    return descriptions
+
+def _enqueue(kind, payload):
+    """Add a notification to the queue, starting the dispatcher if needed.
+    If the backlog is full, the notification is dropped rather than waiting.
+    """
+    global _queue, _dispatcher
+    with _lock:
+        if _dispatcher is None:
+            _queue = Queue(maxsize=config.notifications.backlog)
+            _dispatcher = threading.Thread(target=_dispatch, daemon=True)
+            _dispatcher.start()
+    try:
+        _queue.put_nowait((kind, payload))
+    except Full:
+        console.debug(f'Notification backlog is full, dropped {kind} notification')
+
+def _dispatch():
+    """Send queued notifications in batches, forever.
+    """
+    global _films, _scans
+    due = None
+    scan_due = None
+    while True:
+        timeout = min([t for t in [due, scan_due] if t is not None], default=None)
+        try:
+            kind, payload = _queue.get(timeout=None if timeout is None else max(timeout - time.time(), 0))
+        except Empty:
+            kind, payload = None, None
 
-        # Initialize the Pushover client with your Pushover user key, which can
-        # be found at https://pushover.net
-        pushover = Client(config.pushover.user_key)
+        with _lock:
+            if kind == 'pushover':
+                _films.append(payload)
+                # Schedule the next digest when the first film of a batch arrives.
+                if due is None and config.notifications.batch_minutes:
+                    due = time.time() + config.notifications.batch_minutes * 60
+            elif kind == 'plex':
+                _scans.add(payload)
+                # Each new request postpones the scan, so that films arriving
+                # in quick succession are scanned together.
+                scan_due = time.time() + (config.plex.debounce or 0)
+            films = list(_films)
+            scans = set(_scans)
 
-        message = ('. '.join(film.overview.split('.  ')[:2]) + '.'[:200] + '...') if len(film.overview) > 200 else film.overview
+        # A flush that is waiting sends everything now. One that isn't only
+        # sends the digest if it isn't sent on a schedule.
+        flushing = kind == 'flush'
+        forced = flushing and payload[1]
+        now = time.time()
+        if films and (forced or (flushing and due is None) or (due is not None and now >= due)):
+            _retry('Pushover', _send_pushover, films)
+            with _lock:
+                _films = _films[len(films):]
+            due = None
+        if scans and (forced or (scan_due is not None and now >= scan_due)):
+            _retry('Plex', _send_plex, scans)
+            with _lock:
+                _scans = _scans - scans
+            scan_due = None
+        if flushing:
+            payload[0].set()
 
-        pushover.send_message(
-            message=f"{film.title} ({film.year})\n{message}", 
+def _retry(name, func, *args):
+    """Call func, retrying with exponential backoff if it fails.
+    """
+    for attempt in range(config.notifications.retries + 1):
+        try:
+            func(*args)
+            return
+        except Exception as e:
+            console.debug(f'{name} notification failed ({type(e).__name__}: {e})')
+            if attempt < config.notifications.retries:
+                time.sleep(2 ** attempt)
+    console().red(f'Could not send {name} notification after {config.notifications.retries + 1} attempts').print()
+
+def _send_plex(paths):
+    """Ask Plex to scan the folders that have changed. Each folder is only
+    scanned by the sections that contain it; if a folder is not in any of the
+    configured sections (e.g. if Plex sees it under a different path), those
+    sections are scanned in full instead.
+
+    Args:
+        paths: {str} folders to scan. None scans the sections in full.
+    """
+
+    # Disable the log so that HTTP ops aren't printed to the log.
+    log.disable()
+    try:
+        # Create a connection to the Plex server.
+        plex = PlexServer(baseurl=config.plex.baseurl, token=config.plex.token, timeout=_PLEX_TIMEOUT)
+        sections = [plex.library.section(section) for section in config.plex.sections]
+
+        full = set()
+        scans = []
+        for path in _coalesce(paths):
+            within = [s for s in sections if path is not None
+                and any(_is_within(path, location) for location in s.locations)]
+            if len(within) == 0:
+                full.update(sections)
+            scans.extend((s, path) for s in within)
+
+        # Sections that are scanned in full don't need their folders scanned.
+        scans = [(s, path) for (s, path) in scans if s not in full]
+        for section in full:
+            section.update()
+        for section, path in scans:
+            section.update(path=path)
+    finally:
+        # Re-enable logging when done.
+        log.enable()
+    console.debug(f"Asked Plex to scan {len(scans)} {formatter.pluralize('folder', len(scans))}"
+                  f" and {len(full)} full {formatter.pluralize('section', len(full))}")
+
+def _coalesce(paths) -> [str]:
+    """Remove folders that are inside another folder being scanned.
+    """
+    if None in paths:
+        return [None]
+    coalesced = []
+    for path in sorted(os.path.normpath(p) for p in paths):
+        if not any(_is_within(path, c) for c in coalesced):
+            coalesced.append(path)
+    return coalesced
+
+def _is_within(path, folder) -> bool:
+    """Check if a path is the same as, or inside, a folder.
+    """
+    folder = os.path.normpath(folder)
+    return path == folder or path.startswith(folder.rstrip(os.sep) + os.sep)
+
+def _send_pushover(films):
+    """Send a digest of added films to Pushover. A single film is sent with
+    its overview and poster.
+
+    Args:
+        films: [dict] films that were added, as queued by pushover().
+    """
+
+    # Application API token/key, which can be found by selecting your app
+    # from https://pushover.net/apps and copying the key.
+    init(config.pushover.app_token)
+
+    # Initialize the Pushover client with your Pushover user key, which can
+    # be found at https://pushover.net
+    client = Client(config.pushover.user_key)
+
+    if len(films) > 1:
+        client.send_message(
+            message='\n'.join(f"{f['title']} ({f['year']})" for f in films),
+            title=f'Fylm Added {len(films)} Films')
+        return
+
+    film = films[0]
+    overview = film['overview']
+    message = ('. '.join(overview.split('.  ')[:2]) + '.'[:200] + '...') if len(overview) > 200 else overview
+
+    # Posters are optional, so the film is still sent if it can't be downloaded.
+    attachment = None
+    img = posters.get(film['poster_path'])
+    if img is not None:
+        attachment = ("image.jpg", open(img, "rb"), "image/jpeg")
+
+    try:
+        client.send_message(
+            message=f"{film['title']} ({film['year']})\n{message}", 
             attachment=attachment,
             title='Fylm Added')
-
-        os.remove(img)
\ No newline at end of file
+    finally:
+        if attachment is not None:
+            attachment[1].close()
@@ -29,6 +29,7 @@ from builtins import *
 import os
 import shutil
 import sys
+import hashlib
 import unicodedata
 import itertools
 from itertools import islice
@@ -37,6 +38,9 @@ from multiprocessing import Pool
 import fylmlib.config as config
 from fylmlib.console import console
 from fylmlib.cursor import cursor
+from fylmlib.journal import journal
+from fylmlib.lease import lease
+from fylmlib.probe import probe
 import fylmlib.formatter as formatter
 
 class dirops:
@@ -139,6 +143,29 @@ class dirops:
         # Sort the existing films alphabetically, case-insensitive, and return.
         return sorted(cls._existing_films, key=lambda s: s.title.lower())
 
+    @classmethod
+    def refresh_existing_films(cls, paths):
+        """Update the loaded list of existing films after films have been moved,
+        without scanning the destination dirs again. Films at the specified
+        paths are reloaded, and films that no longer exist are removed.
+
+        Args:
+            paths: [str] paths of existing films that were added or changed.
+        """
+
+        # If existing films have not been loaded yet, they will be loaded in full when needed.
+        if not cls._existing_films:
+            return
+
+        # Import Film here to avoid circular import conflicts.
+        from fylmlib.film import Film
+
+        paths = set(os.path.normpath(p) for p in paths)
+        cls._existing_films = [f for f in cls._existing_films
+            if f.source_path not in paths and os.path.exists(f.source_path)]
+        cls._existing_films += [f for f in map(Film, (p for p in paths if os.path.exists(p)))
+            if f.should_ignore is False]
+
     @classmethod
     def get_new_films(cls, paths):
         """Get a list of new potenial films we want to tidy up.
@@ -154,28 +181,31 @@ class dirops:
         # Import Film here to avoid circular import conflicts.
         from fylmlib.film import Film
 
-        films = []
-
         # Convert to a list if paths is not already (safety check)
         if isinstance(paths, str):
             paths = [paths]
 
+        film_paths = []
         for path in paths:
 
             # Check if the source path is a single file (usually because of the -s switch)
-            if len(paths) == 1 and os.path.exists(path) and os.path.isfile(path):
-                films.append([Film(path)])
-                break
+            if os.path.isfile(path):
+                film_paths.append(path)
+                continue
 
             # Enumerate the search path(s) for files/subfolders, then sanitize them.
             # If using the `limit` option, create a sliced list to limit the number of
             # files to be processed.
             raw_films = islice(cls.sanitize_dir_list(os.listdir(
                 path)), config.limit if config.limit > 0 else None)
+            film_paths.extend(os.path.join(path, file) for file in raw_films)
+
+        # Start probing the metadata of any files that need it before the films
+        # are loaded, so that they are probed concurrently, not one at a time.
+        probe.prefetch(film_paths)
 
-            # Map the list to Film objects and extend the films list
-            films.extend(
-                list(map(Film, [os.path.join(path, file) for file in raw_films])))
+        # Map the list to Film objects
+        films = list(map(Film, film_paths))
 
         # Sort the resulting list of files alphabetically, case-insensitive.
         films.sort(key=lambda x: x.title.lower())
@@ -222,6 +252,27 @@ class dirops:
         return sorted(valid_files, key=os.path.getsize, reverse=True)
 
 
+    @classmethod
+    def get_files(cls, path) -> ([str], [str]):
+        """Get lists of both valid and invalid files inside the specified path,
+        searching it only once. See get_valid_files() and get_invalid_files().
+
+        Args:
+            path: (str, utf-8) path to search for files.
+        Returns:
+            A tuple of (valid files sorted by size, largest first, invalid files).
+        """
+        valid_files = []
+        invalid_files = []
+        for f in cls.find_deep(path):
+            if (fileops.has_valid_ext(f)
+                and not fileops.contains_ignored_strings(f)
+                and fileops.is_acceptable_size(f)):
+                valid_files.append(f)
+            else:
+                invalid_files.append(f)
+        return (sorted(valid_files, key=os.path.getsize, reverse=True), invalid_files)
+
     @classmethod
     def get_invalid_files(cls, path):
         """Get a list of invalid files inside the specified dir.
@@ -259,7 +310,8 @@ class dirops:
         On macOS, unicode normalization must take place for loading files with
         unicode chars. This method correctly normalizes these strings.
         It also will remove .DS_Store and Thumbs.db from the list, since we
-        don't ever care to count, or otherwise observe, these system files.
+        don't ever care to count, or otherwise observe, these system files,
+        as well as the dir that holds lease files.
 
         Args:
             files: (str, utf-8) list of files in dir.
@@ -267,8 +319,9 @@ class dirops:
             A sanitized, unicode-ready array of files.
         """
         return list(filter(lambda f: 
-            not any([f.lower() in map(lambda x: x.lower(), config.ignore_strings)])
-            and not f.endswith('.DS_Store') and not f.endswith('Thumbs.db'),
+            f.lower() not in config.derived.ignore_strings
+            and not f.endswith('.DS_Store') and not f.endswith('Thumbs.db')
+            and f != lease.dirname,
             [unicodedata.normalize('NFC', file) for file in files]))
         
     @classmethod
@@ -327,11 +380,13 @@ class dirops:
             max_size: (int) optional max size in Bytes a folder can be to qualify for deletion. Default=50000.
         """
 
-        # Get count of files
-        files_count = len(cls.find_deep(path))
+        # Walk the dir once to get the count of files and the total size.
+        files = [os.path.join(root, f) for root, dirs, fs in os.walk(path) for f in fs]
+        files_count = len(cls.sanitize_dir_list(files))
+        dir_size = sum(os.path.getsize(f) for f in files if os.path.isfile(f))
 
         # First we ensure the dir is less than the max_size threshold, otherwise abort.
-        if _size_dir(path) < max_size or max_size == -1 or files_count == 0:
+        if dir_size < max_size or max_size == -1 or files_count == 0:
 
             console.debug(f'Recursively deleting {path}')
 
@@ -354,7 +409,7 @@ class dirops:
             )
 
     @classmethod
-    def delete_unwanted_files(cls, path):
+    def delete_unwanted_files(cls, path, invalid_files=None):
         """Delete all unwanted files in the specified dir.
 
         Using recursion, delete all invalid (unwanted) files and folders in the specified dir,
@@ -363,7 +418,8 @@ class dirops:
 
         Args:
             path: (str, utf-8) root path where contents will be deleted.
-            count: (int) optional current number of deleted files (in case this is called multiple times
+            invalid_files: [str] optional list of invalid files already found in path,
+                           to avoid searching it again.
         Returns:
             Number of files that were deleted successfully.
         """
@@ -375,7 +431,8 @@ class dirops:
             # Only delete unwanted files if enabled in config
             if config.remove_unwanted_files:
                 # Search for invalid files, enumerate them, and delete them.
-                for f in [f for f in cls.get_invalid_files(path) if os.path.isfile(f)]:
+                invalid_files = cls.get_invalid_files(path) if invalid_files is None else invalid_files
+                for f in [f for f in invalid_files if os.path.isfile(f)]:
                     # Increment deleted_files if deletion was successful.
                     # `fileops.delete` has test check built in, so
                     # no need to check here.
@@ -396,7 +453,7 @@ class fileops:
         Returns:
             True if the file has a valid extension, else False.
         """
-        return any([path.endswith(ext) for ext in config.video_exts + config.extra_exts])
+        return os.path.splitext(path)[1] in config.derived.valid_exts
 
     @classmethod
     def is_acceptable_size(cls, file_path):
@@ -408,12 +465,14 @@ class fileops:
             True, if the file is an acceptable size, else False.
         """
         s = size(file_path)
-        min = cls.min_filesize_for_resolution(file_path)
-        is_video = any([file_path.endswith(ext) for ext in config.video_exts])
-        is_extra = any([file_path.endswith(ext) for ext in config.extra_exts])
+        ext = os.path.splitext(file_path)[1]
 
-        return ((s >= min * 1024 * 1024 and is_video)
-                or (s >= 0 and is_extra))
+        # Import parser here to avoid circular import conflicts.
+        from fylmlib.parser import parser
+        min = config.derived.min_filesize_for(parser.get_resolution(file_path))
+
+        return ((s >= min and ext in config.derived.video_exts)
+                or (s >= 0 and ext in config.derived.extra_exts))
 
     @classmethod
     def min_filesize_for_resolution(cls, file_path):
@@ -422,27 +481,13 @@ class fileops:
         Args:
             file: (str, utf-8) path to file.
         Returns:
-            int: The minimum file size, or default if resolution could not be determined
+            int: The minimum file size in MB, or default if resolution could not be determined
         """
-        min = config.min_filesize
-        if isinstance(min, int):
-            return min
-
-        # If the min filesize is not an int, we assume
-        # that it is an AttrMap of resolutions.
         from fylmlib.parser import parser
-        res = parser.get_resolution(file_path)
-        if res is None:
-            return min.default
-        if res == '720p' or res == '1080p' or res == '2160p':
-            return min[res]
-        elif res.lower() == 'sd' or res.lower() == 'sdtv':
-            return min.SD
-        else:
-            return min.default
+        return config.derived.min_filesize_for(parser.get_resolution(file_path)) // (1024 * 1024)
 
     @classmethod
-    def safe_move(cls, src: str, dst: str, ok_to_upgrade = False):
+    def safe_move(cls, src: str, dst: str, ok_to_upgrade = False, tx = None):
         """Performs a 'safe' move operation.
 
         Performs some additional checks before moving files. Optionally supports
@@ -455,6 +500,7 @@ class fileops:
             ok_to_upgrade: (Bool) True if this file is OK to replace an existing one
                                   as determined by checking for identical duplicates
                                   that meet upgrade criteria.
+            tx: (str) optional journal transaction id to record steps in.
 
         Returns:
             True if the file move was successful, else False.
@@ -509,10 +555,22 @@ class fileops:
             # If we're overwriting, first try and rename the existing (identical) 
             # duplicate so we don't lose it if the move fails
             if os.path.exists(dst):
+                journal.record(tx, 'dup', path=dst)
                 os.rename(dst, f'{dst}.dup')
 
+            # Choose the cheapest safe strategy for the destination's transfer mode.
+            mode = config.derived.transfer_mode(dst)
+            strategy = cls.transfer_strategy(src, dst)
+
+            # Symlinks and hard links leave the source in place.
+            if strategy == 'symlink':
+                os.symlink(os.path.abspath(src), dst)
+
+            elif strategy == 'hardlink':
+                os.link(src, dst)
+
             # If safe_copy is enabled, or if partition is not the same, copy instead.
-            if config.safe_copy is True or not dirops.is_same_partition(src, dst): 
+            elif strategy in ['reflink', 'copy']:
 
                 # Store the size of the source file to verify the copy was successful.
                 expected_size = size(src)
@@ -521,26 +579,55 @@ class fileops:
                 # has not be completely copied.
                 partial_dst = f'{dst}.partial~'
 
-                # Copy the file using progress bar
-                cls.copy_with_progress(src, partial_dst)
+                # If a previous copy was interrupted, find out how much of it can be kept.
+                offset = cls.resume_offset(src, partial_dst)
+
+                # Try to clone the file first if reflinks are enabled, otherwise
+                # copy the file using progress bar.
+                verifier = None
+                if not (offset == 0 and strategy == 'reflink' and cls.reflink(src, partial_dst)):
+                    strategy = 'copy'
+
+                    # If verification is enabled, hash the data as it is copied.
+                    if config.verify_copies is True:
+                        verifier = _CopyVerifier(expected_size)
+                        if offset > 0:
+                            verifier.update_from(src, offset)
+
+                    if offset > 0:
+                        console().dark_gray().indent(f"Resuming copy from {formatter.pretty_size(offset)}").print()
+                    cls.copy_with_progress(src, partial_dst, verifier=verifier, offset=offset)
+
+                # Verify the copied data against the destination, if enabled.
+                if verifier is not None and not verifier.verify(partial_dst):
+                    console().red().indent(f"Checksum mismatch; '{os.path.basename(dst)}' was not copied correctly").print()
+                    cls._discard_copy(dst, partial_dst)
+                    return False
 
                 # Verify that the file is within one byte of the original.
                 dst_size = size(partial_dst)
                 if abs(dst_size - expected_size) <= 1:
                     os.rename(partial_dst, partial_dst.rsplit('.partial~', 1)[0])
-                    os.remove(src)
+                    # In hardlink mode, the source stays in place even if it had to be copied.
+                    if mode != 'hardlink':
+                        os.remove(src)
 
                 # If not, then we print an error and return False.
                 else:
-                    console().red().indent(f"Size mismatch; file is {dst_size:,} bytes, expected {expected_size:,} bytes")
+                    console().red().indent(f"Size mismatch; file is {dst_size:,} bytes, expected {expected_size:,} bytes").print()
+                    cls._discard_copy(dst, partial_dst)
                     return False
             
             # Otherwise, move the file instead.
             else: 
                 shutil.move(src, dst)
 
+            console.debug(f"Transferred '{os.path.basename(dst)}' using {strategy} ({mode} mode)")
+            if strategy in ['reflink', 'hardlink', 'symlink']:
+                console().dark_gray().indent(f"Transferred using {strategy}; no data was copied").print()
+
             # Clean up any backup duplicate that might have been created, if the move was successful
-            if os.path.exists(dst) and os.path.exists(f'{dst}.dup'):
+            if os.path.lexists(dst) and os.path.exists(f'{dst}.dup'):
                 os.remove(f'{dst}.dup')
 
             return True
@@ -559,7 +646,123 @@ class fileops:
             return False
 
     @classmethod
-    def copy_with_progress(cls, src, dst, follow_symlinks=True):
+    def _discard_copy(cls, dst, partial_dst):
+        """Remove a copy that failed verification, so that a later run does not
+        resume from its bad data, and restore the duplicate it was replacing.
+
+        Args:
+            dst: (str, utf-8) destination of the copy.
+            partial_dst: (str, utf-8) path of the partial copy.
+        """
+        if os.path.exists(partial_dst):
+            os.remove(partial_dst)
+        if os.path.exists(f'{dst}.dup'):
+            os.rename(f'{dst}.dup', dst)
+
+    @classmethod
+    def leaves_source(cls, dst) -> bool:
+        """Check if files transferred to a destination are linked, which
+        leaves the source in place (e.g. for seeding), so that it must not be
+        renamed or cleaned up.
+
+        Args:
+            dst: (str, utf-8) destination of a file.
+        Returns:
+            True if the destination's transfer mode is hardlink or symlink.
+        """
+        return config.derived.transfer_mode(dst) in ['hardlink', 'symlink']
+
+    @classmethod
+    def transfer_strategy(cls, src, dst) -> str:
+        """Determine how safe_move() will transfer a file, from the destination's
+        transfer mode and whether the source and destination are on the same
+        partition.
+
+        Args:
+            src: (str, utf-8) path of file to move.
+            dst: (str, utf-8) destination for file to move to.
+        Returns:
+            'symlink', 'hardlink', 'reflink' (falls back to copying if cloning
+            is not supported), 'copy', or 'move'.
+        """
+        mode = config.derived.transfer_mode(dst)
+        same_partition = dirops.is_same_partition(src, dst)
+
+        if mode == 'symlink':
+            return 'symlink'
+        elif mode == 'hardlink' and same_partition:
+            return 'hardlink'
+        elif config.safe_copy is True or not same_partition or mode == 'hardlink':
+            return 'reflink' if mode == 'reflink' else 'copy'
+        else:
+            return 'move'
+
+    @classmethod
+    def resume_offset(cls, src, partial_dst) -> int:
+        """Determine how much of an interrupted copy can be kept, so that
+        copying can continue from where it left off.
+
+        The end of the partial file is discarded, in case it was not fully
+        written before the interruption, and the rest is compared to the
+        source in sampled regions.
+
+        Args:
+            src: (str, utf-8) path to source file.
+            partial_dst: (str, utf-8) path to the partially copied file.
+        Returns:
+            The offset to resume copying from, or 0 to start over.
+        """
+        if config.resume_copies is not True or not os.path.isfile(partial_dst):
+            return 0
+
+        # Discard the last (up to) 1 MB of the partial file.
+        offset = max(size(partial_dst) - 1024 * 1024, 0)
+        if offset == 0 or offset >= size(src):
+            return 0
+
+        with open(src, 'rb') as fsrc:
+            with open(partial_dst, 'rb') as fdst:
+                for (start, stop) in _sample_regions(offset):
+                    if any(a != b for (a, b) in zip(_iter_region(fsrc, start, stop), _iter_region(fdst, start, stop))):
+                        console.debug(f'Partial copy {partial_dst} does not match the source, starting over')
+                        return 0
+
+        return offset
+
+    @classmethod
+    def reflink(cls, src, dst) -> bool:
+        """Clone src to dst with a copy-on-write reflink, so that no data is
+        copied. Only supported on Linux filesystems that implement the FICLONE
+        ioctl (e.g. btrfs and XFS), and only within the same filesystem.
+
+        Args:
+            src: (str, utf-8) path to source file.
+            dst: (str, utf-8) path to destination file.
+        Returns:
+            True if the file was cloned, else False (dst is not left behind).
+        """
+        try:
+            import fcntl
+        except ImportError:
+            return False
+
+        # FICLONE, from linux/fs.h: _IOW(0x94, 9, int)
+        FICLONE = 0x40049409
+
+        try:
+            with open(src, 'rb') as fsrc:
+                with open(dst, 'wb') as fdst:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            shutil.copymode(src, dst)
+            return True
+        except (IOError, OSError) as e:
+            console.debug(f'Unable to reflink {src} ({e}), falling back to copy')
+            if os.path.exists(dst):
+                os.remove(dst)
+            return False
+
+    @classmethod
+    def copy_with_progress(cls, src, dst, follow_symlinks=True, verifier=None, offset=0):
         """Copy data from src to dst and print a progress bar.
 
         If follow_symlinks is not set and src is a symbolic link, a new
@@ -569,11 +772,17 @@ class fileops:
             src: (str, utf-8) path to source file.
             dst: (str, utf-8) path to destionation.
             follow_symlinks: (bool) follows symbolic links to files and re-creates them.
+            verifier: (_CopyVerifier) optional verifier to hash the data as it is copied.
+            offset: (int) offset to resume copying from, keeping the data before
+                          it that already exists in dst.
 
         """
 
-        # Hide the cursor
-        cursor.hide()
+        # Hide the cursor, unless copying in the background, where it could
+        # interfere with a prompt.
+        live = console.is_live()
+        if live:
+            cursor.hide()
 
         # If the destination is a folder, include the folder
         # in the destination copy.
@@ -600,20 +809,26 @@ class fileops:
         else:
             size = os.stat(src).st_size
             with open(src, 'rb') as fsrc:
-                with open(dst, 'wb') as fdst:
-                    cls._copyfileobj(fsrc, fdst, callback=console().print_copy_progress_bar, total=size)
+                with open(dst, 'r+b' if offset > 0 else 'wb') as fdst:
+                    if offset > 0:
+                        fsrc.seek(offset)
+                        fdst.seek(offset)
+                        fdst.truncate()
+                    cls._copyfileobj(fsrc, fdst, callback=console().print_copy_progress_bar, total=size,
+                        verifier=verifier, offset=offset)
         
         # Perform a low-level copy.
         shutil.copymode(src, dst)
 
-        # Show the cursor.
-        cursor.show()
+        if live:
+            # Show the cursor.
+            cursor.show()
 
-        # Clear the progress bar from the console.
-        console.clearline()
+            # Clear the progress bar from the console.
+            console.clearline()
 
     @classmethod
-    def _copyfileobj(cls, fsrc, fdst, callback, total, length=16*1024):
+    def _copyfileobj(cls, fsrc, fdst, callback, total, length=16*1024, verifier=None, offset=0):
         """Internal method for low-level copying.
 
         Executes low-level file system copy and calls back progress
@@ -625,14 +840,18 @@ class fileops:
             callback: (function) callback function to be called when progress is changed.
             total: (int) total expected size of file in B.
             length: (int) total length of buffer.
+            verifier: (_CopyVerifier) optional verifier to hash the data as it is copied.
+            offset: (int) offset in the file that copying starts from.
 
         """
-        copied = 0
+        copied = offset
         while True:
             buf = fsrc.read(length)
             if not buf:
                 break
             fdst.write(buf)
+            if verifier is not None:
+                verifier.update(copied, buf)
             copied += len(buf)
             callback(copied, total=total)
 
@@ -696,7 +915,8 @@ class fileops:
         Returns:
             True if any of the ignored strings are found in the file path, else False.
         """
-        return any(word.lower() in path.lower() for word in config.ignore_strings)
+        pattern = config.derived.ignore_pattern
+        return pattern is not None and pattern.search(path.lower()) is not None
 
     @classmethod
     def delete(cls, file):
@@ -726,6 +946,106 @@ class fileops:
             # Return 0 because we don't want a success counter to increment.
             return 0
 
+class _CopyVerifier(object):
+    """Verifies a copy by hashing the source data as it is streamed, then
+    comparing it to the same regions read back from the destination.
+
+    The regions are config.verify_samples evenly spaced blocks of
+    config.verify_sample_size MB, so only a small part of the destination
+    is read back. If verify_samples is 0, or the file is smaller than the
+    samples, the whole file is compared.
+    """
+    def __init__(self, total):
+        self.total = total
+        self.regions = _sample_regions(total)
+        self._hashes = [hashlib.blake2b() for _ in self.regions]
+
+    def update(self, offset, buf):
+        """Hash the part of a copied buffer that falls within each region.
+
+        Args:
+            offset: (int) offset of the buffer in the file.
+            buf: (bytes) data that was copied.
+        """
+        end = offset + len(buf)
+        for ((start, stop), h) in zip(self.regions, self._hashes):
+            if start < end and offset < stop:
+                h.update(buf[max(start - offset, 0):min(stop, end) - offset])
+
+    def update_from(self, path, end):
+        """Hash the parts of each region before `end` by reading them from a
+        file. Used when resuming a copy, for data that was copied previously.
+
+        Args:
+            path: (str, utf-8) path to the source file.
+            end: (int) offset up to which to read.
+        """
+        with open(path, 'rb') as f:
+            for ((start, stop), h) in zip(self.regions, self._hashes):
+                if start < end:
+                    for buf in _iter_region(f, start, min(stop, end)):
+                        h.update(buf)
+
+    def verify(self, path) -> bool:
+        """Read back each region from the destination and compare its hash.
+
+        Args:
+            path: (str, utf-8) path to the copied file.
+        Returns:
+            True if every region matches the source data, else False.
+        """
+        with open(path, 'rb') as f:
+            for ((start, stop), h) in zip(self.regions, self._hashes):
+                d = hashlib.blake2b()
+                for buf in _iter_region(f, start, stop):
+                    d.update(buf)
+                if d.digest() != h.digest():
+                    console.debug(f'Checksum mismatch in {path} at bytes {start}-{stop}')
+                    return False
+        return True
+
+def _sample_regions(total):
+    """Divide a file into config.verify_samples evenly spaced regions of
+    config.verify_sample_size MB, which are compared when verifying or
+    resuming copies. If verify_samples is 0, or the file is smaller than
+    the samples, the whole file is one region.
+
+    Args:
+        total: (int) size of the file, in bytes.
+    Returns:
+        A list of (start, stop) byte offsets.
+    """
+    samples = config.verify_samples or 0
+    sample_size = int((config.verify_sample_size or 0) * 1024 * 1024)
+
+    if samples < 1 or sample_size < 1 or samples * sample_size >= total:
+        return [(0, total)]
+    elif samples == 1:
+        return [(0, sample_size)]
+    else:
+        offsets = [i * (total - sample_size) // (samples - 1) for i in range(samples)]
+        return [(o, o + sample_size) for o in offsets]
+
+def _iter_region(f, start, stop, length=1024*1024):
+    """Read the bytes between two offsets of an open file, in chunks.
+
+    Args:
+        f: (file) file opened for binary reading.
+        start: (int) offset to start reading from.
+        stop: (int) offset to stop reading at.
+        length: (int) maximum length of each chunk.
+    Yields:
+        Chunks of bytes, which may end early if the file ends first.
+    """
+    f.seek(start)
+    remaining = stop - start
+    while remaining > 0:
+        buf = f.read(min(remaining, length))
+        if not buf:
+            break
+        remaining -= len(buf)
+        yield buf
+
 def largest_video(path):
     """Determine the largest video file in dir.
 
@@ -742,7 +1062,7 @@ def largest_video(path):
         if os.path.isdir(path):
             
             try:
-                video_files = list(filter(lambda f: os.path.splitext(f)[1] in config.video_exts, dirops.get_valid_files(path)))
+                video_files = list(filter(lambda f: os.path.splitext(f)[1] in config.derived.video_exts, dirops.get_valid_files(path)))
 
                 # Re-populate list with (filename, size) tuples
                 for i, file in enumerate(video_files):
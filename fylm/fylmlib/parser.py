@@ -20,6 +20,7 @@ to determine various properties used in the name correction
 and TMDb lookup.
 
     parser: the main class exported by this module.
+    ParseResult: a structured record of all attributes parsed from a path.
 """
 
 from __future__ import unicode_literals, print_function
@@ -27,17 +28,73 @@ from builtins import *
 
 import os
 import re
+from collections import namedtuple
+from multiprocessing import Pool
 
 import fylmlib.config as config
 import fylmlib.patterns as patterns
 import fylmlib.formatter as formatter
 from fylmlib.enums import Media
 
+# A structured record of all attributes parsed from a single path.
+ParseResult = namedtuple('ParseResult', [
+    'path', 'title', 'year', 'edition', 'resolution', 'media', 'is_hdr', 'is_proper', 'part'])
+
 class parser:
     """Main class for film parser.
 
     All methods are class methods, thus this class should never be instantiated.
     """
+    @classmethod
+    def parse(cls, source_path) -> ParseResult:
+        """Parse all attributes from full path of file or folder.
+
+        Args:
+            source_path: (str, utf-8) full path of file or folder.
+
+        Returns:
+            A ParseResult record for the path.
+        """
+
+        source_path = str(source_path)
+
+        return ParseResult(
+            path=source_path,
+            title=cls.get_title(source_path),
+            year=cls.get_year(source_path),
+            edition=cls.get_edition(source_path),
+            resolution=cls.get_resolution(source_path),
+            media=cls.get_media(source_path),
+            is_hdr=cls.is_hdr(source_path),
+            is_proper=cls.is_proper(source_path),
+            part=cls.get_part(source_path))
+
+    @classmethod
+    def parse_many(cls, paths, processes=1, chunksize=64) -> [ParseResult]:
+        """Parse all attributes from a list of file or folder paths.
+
+        Parsing is pure string processing, so for large corpora the work can
+        be spread across a process pool.
+
+        Args:
+            paths: (list) full paths of files or folders.
+            processes: (int) number of worker processes to use, or None to use
+                       one per CPU. If 1 (default), or if there are no more
+                       paths than chunksize, paths are parsed in the current process.
+            chunksize: (int) number of paths sent to a worker at a time.
+
+        Returns:
+            A list of ParseResult records, in the same order as paths.
+        """
+
+        paths = [str(p) for p in paths]
+
+        if (processes is None or processes > 1) and len(paths) > chunksize:
+            with Pool(processes=processes) as pool:
+                return pool.map(_parse, paths, chunksize=chunksize)
+
+        return [cls.parse(p) for p in paths]
+
     @classmethod
     def get_title(cls, source_path):
         """Get title from full path of file or folder.
@@ -101,8 +158,9 @@ class parser:
 
         # Add back in . to titles or strings we know need to to keep periods.
         # Looking at you, S.W.A.T and After.Life.
-        for keep_period_str in config.keep_period:
-            title = re.sub(re.compile(r'\b' + re.escape(keep_period_str) + r'\b', re.I), keep_period_str, title)
+        derived = config.derived
+        if derived.keep_period is not None:
+            title = derived.keep_period.sub(lambda m: derived.keep_period_map[m.group().lower()], title)
 
         # Remove extra whitespace from the edges of the title and remove repeating
         # whitespace.
@@ -324,3 +382,9 @@ class parser:
 
         # If no matches are found, return (None, None)
         return (None, None)
+
+def _parse(source_path):
+    """Module-level passthrough to parser.parse(), so it can be pickled
+    and called from a process pool.
+    """
+    return parser.parse(source_path)
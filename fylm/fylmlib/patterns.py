@@ -45,6 +45,13 @@ proper = re.compile(r'\d{4}.*?\b(?P<proper>proper)\b', re.I)
 # Compiled pattern that matches HDR.
 hdr = re.compile(r'\b(?P<hdr>hdr)\b', re.I)
 
+# Compiled pattern that matches titles beginning with 'The', or ending
+# in ', The', case insensitive.
+title_the = re.compile(r'(^the\b|, the)', re.I)
+
+# Compiled pattern that matches TV show season/episode tags, e.g. S01 or S01E01.
+tv_show = re.compile(r'\bS\d{2}(E\d{2})?\b', re.I)
+
 # Compiled pattern that "Part n" where n is a number or roman numeral.
 part = re.compile(r'\bpart\W?(?P<part>(?:(\d+|M{0,4}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3}))))', re.I)
 
@@ -0,0 +1,193 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Staged concurrent processing for Fylm.
+
+This module runs items through a series of stages connected by bounded
+queues, each with its own number of worker threads, so that slow stages
+(e.g. network lookups and disk transfers) for different items overlap.
+Console output is kept together per item, in the order items were added.
+
+    Pipeline: the main class exported by this module.
+    Stage: a single step of a pipeline.
+"""
+
+from __future__ import unicode_literals, print_function
+from builtins import *
+
+import threading
+from queue import Queue
+
+from fylmlib.console import console
+
+# Marks the end of the items in a queue.
+_DONE = object()
+
+class Stage(object):
+    """A single step of a pipeline.
+
+    Attributes:
+        name:       Name of the stage, e.g. 'lookup'.
+
+        func:       Function that takes an item and returns the item to pass
+                    to the next stage, or None to stop processing it.
+
+        workers:    Number of threads that run this stage concurrently.
+    """
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(int(workers or 1), 1)
+
+class Pipeline(object):
+    """Runs items through a series of stages.
+
+    Each item passes through the stages in order, but different items can be
+    in different stages at the same time. Console output printed while an
+    item is processed is held until all items added before it are finished,
+    then printed, so the output for each item is never interleaved.
+
+    Attributes:
+        stages:     [Stage] stages to run each item through, in order.
+
+        maxsize:    Maximum number of items waiting for each stage.
+
+        finish:     Optional function called with each item (as it was added)
+                    once it has passed through every stage, or been dropped.
+    """
+    def __init__(self, stages, maxsize=8, finish=None):
+        self.stages = stages
+        self.maxsize = maxsize
+        self.finish = finish
+
+    def run(self, items):
+        """Run all items through the pipeline, and wait for them to finish.
+        If a stage raises an exception, no more items are started, and the
+        first exception is raised once the items in progress are finished.
+
+        Args:
+            items: (iterable) items to process.
+        """
+        self._queues = [Queue(maxsize=self.maxsize) for _ in self.stages]
+        self._items = []
+        self._outputs = []
+        self._head = 0
+        self._lock = threading.Lock()
+        self._error = None
+        self._remaining = [s.workers for s in self.stages]
+
+        # Workers print on behalf of this thread.
+        self._tee = console.get_tee()
+
+        threads = [threading.Thread(target=self._work, args=(i,), daemon=True)
+            for i, stage in enumerate(self.stages) for _ in range(stage.workers)]
+        for t in threads:
+            t.start()
+
+        for item in items:
+            if self._error is not None:
+                break
+            with self._lock:
+                index = len(self._outputs)
+                self._items.append(item)
+                self._outputs.append(_Output(live=(index == self._head)))
+            self._queues[0].put((index, item))
+
+        for _ in range(self.stages[0].workers):
+            self._queues[0].put(_DONE)
+
+        for t in threads:
+            t.join()
+
+        if self._error is not None:
+            raise self._error
+
+    def _work(self, i):
+        """Worker thread loop for stage i.
+        """
+        stage = self.stages[i]
+        console.tee(self._tee)
+        while True:
+            job = self._queues[i].get()
+            if job is _DONE:
+                break
+
+            (index, item) = job
+            console.capture(self._outputs[index])
+            try:
+                item = stage.func(item) if self._error is None else None
+            except Exception as e:
+                with self._lock:
+                    self._error = self._error or e
+                item = None
+            finally:
+                console.capture(None)
+
+            if item is None or i == len(self.stages) - 1:
+                if self.finish is not None:
+                    console.capture(self._outputs[index])
+                    try:
+                        self.finish(self._items[index])
+                    except Exception as e:
+                        with self._lock:
+                            self._error = self._error or e
+                    finally:
+                        console.capture(None)
+                self._finish(index)
+            else:
+                self._queues[i + 1].put((index, item))
+
+        # When the last worker of a stage finishes, tell the next stage's workers.
+        with self._lock:
+            self._remaining[i] -= 1
+            last = self._remaining[i] == 0
+        if last and i < len(self.stages) - 1:
+            for _ in range(self.stages[i + 1].workers):
+                self._queues[i + 1].put(_DONE)
+
+    def _finish(self, index):
+        """Mark an item as finished, then print the held output of each
+        following item in turn, until reaching one that is still in progress.
+        """
+        with self._lock:
+            self._outputs[index].finished = True
+            while self._head < len(self._outputs) and self._outputs[self._head].finished:
+                self._head += 1
+                if self._head < len(self._outputs):
+                    self._outputs[self._head].flush()
+
+class _Output(object):
+    """Console output sink for a single item in a pipeline. Output is held
+    until the item becomes live (all items before it have finished).
+    """
+    def __init__(self, live=False):
+        self.live = live
+        self.finished = False
+        self._held = []
+        self._lock = threading.Lock()
+
+    def defer(self, c, should_log):
+        with self._lock:
+            if self.live:
+                return False
+            self._held.append((c, should_log))
+            return True
+
+    def flush(self):
+        with self._lock:
+            for (c, should_log) in self._held:
+                c.output(should_log)
+            self._held = []
+            self.live = True
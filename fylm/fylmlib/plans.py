@@ -0,0 +1,201 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Run plans for Fylm.
+
+This module writes everything Fylm decided in a run (each film's TMDb match,
+destination, duplicate actions, and how each file will be transferred) to a
+JSON plan without changing anything on disk, and loads a plan so that it can
+be applied later without looking any of the films up again.
+
+    plans: the main class exported by this module.
+"""
+
+from __future__ import unicode_literals, print_function
+from builtins import *
+
+import os
+import json
+import datetime
+import threading
+
+from fylmlib.console import console
+from fylmlib.probe import probe
+import fylmlib.operations as ops
+import fylmlib.formatter as formatter
+
+class plans:
+    """Main class for writing and applying run plans.
+
+    All methods are class methods, thus this class should never be instantiated.
+    """
+
+    # Version of the plan format.
+    version = 1
+
+    # Planned films, in the order they were planned.
+    _films = []
+    _lock = threading.Lock()
+
+    # Destination paths written so far while applying a plan.
+    _written = set()
+
+    @classmethod
+    def add(cls, film, queued_ops):
+        """Record a film's planned moves.
+
+        Args:
+            film: (Film) film that was planned.
+            queued_ops: [_QueuedMoveOperation] the film's planned moves.
+        """
+        entry = {
+            'source_path': film.original_path,
+            'match': cls._match(film),
+            'destination_path': film.destination_path,
+            'duplicates': cls._duplicates(film),
+            'files': [{
+                'source_path': op.file.source_path,
+                'destination_path': op.dst,
+                'strategy': ops.fileops.transfer_strategy(op.file.source_path, op.dst)
+            } for op in queued_ops]
+        }
+        with cls._lock:
+            cls._films.append(entry)
+
+    @classmethod
+    def write(cls, path):
+        """Write all of the recorded films to a plan, and clear them.
+
+        Args:
+            path: (str, utf-8) path of the plan to write.
+        """
+        with cls._lock:
+            films = sorted(cls._films, key=lambda f: f['source_path'].lower())
+            cls._films = []
+        with open(path, 'w') as f:
+            json.dump({
+                'version': cls.version,
+                'created': datetime.datetime.now().isoformat(),
+                'films': films
+            }, f, indent=2)
+        console().pink(f"\nWrote plan for {len(films)} {formatter.pluralize('film', len(films))} to '{path}'").print()
+
+    @classmethod
+    def load(cls, path) -> ['Film']:
+        """Load the films in a plan, with their TMDb matches restored.
+
+        Args:
+            path: (str, utf-8) path of the plan to apply.
+        Returns:
+            A list of Film objects, each with its planned entry in `planned`.
+        """
+
+        # Import Film here to avoid circular import conflicts.
+        from fylmlib.film import Film
+
+        with open(path, 'r') as f:
+            plan = json.load(f)
+        if plan.get('version') != cls.version:
+            raise ValueError(f"'{path}' is not a supported plan")
+
+        with cls._lock:
+            cls._written = set()
+
+        entries = []
+        for entry in plan['films']:
+            if not os.path.exists(entry['source_path']):
+                console().yellow(f"'{entry['source_path']}' no longer exists and will be skipped").print()
+                continue
+            entries.append(entry)
+
+        # Start probing the metadata of any files that need it before the films are loaded.
+        probe.prefetch([entry['source_path'] for entry in entries])
+
+        films = []
+        for entry in entries:
+            film = Film(entry['source_path'])
+            for k, v in entry['match'].items():
+                setattr(film, k, v)
+            film.planned = entry
+            films.append(film)
+        return films
+
+    @classmethod
+    def restore(cls, film) -> bool:
+        """Used in place of looking a film up when applying a plan. Checks that
+        the film would still be handled as planned, and prints its match.
+
+        Args:
+            film: (Film) film loaded from a plan.
+        Returns:
+            bool: True if the film should continue to be processed, otherwise False.
+        """
+        changed = None
+        if film.should_ignore is True:
+            changed = film.ignore_reason
+        elif film.destination_path != film.planned['destination_path']:
+            changed = f"destination is now '{film.destination_path}'"
+        # Films moved earlier in the same plan may now be duplicates, but they
+        # are handled the same way as they would be in a normal run.
+        elif [d for d in cls._duplicates(film) if not cls._was_written(d['duplicate'])] != film.planned['duplicates']:
+            changed = 'duplicates have changed'
+
+        if changed is not None:
+            console().yellow().indent(f'Skipped; the plan is out of date ({changed})').print()
+            return False
+
+        console().print_search_result(film)
+        return True
+
+    @classmethod
+    def written(cls, path):
+        """Record that a file was moved to a destination while applying a plan.
+
+        Args:
+            path: (str, utf-8) destination path of the file.
+        """
+        with cls._lock:
+            cls._written.add(path)
+
+    @classmethod
+    def _was_written(cls, path) -> bool:
+        """True if a file was moved to path earlier while applying the plan.
+        """
+        with cls._lock:
+            return path in cls._written
+
+    @classmethod
+    def _match(cls, film) -> dict:
+        """A film's TMDb match.
+        """
+        return {
+            'title': film.title,
+            'year': film.year,
+            'tmdb_id': film.tmdb_id,
+            'overview': film.overview,
+            'poster_path': film.poster_path,
+            'title_similarity': film.title_similarity
+        }
+
+    @classmethod
+    def _duplicates(cls, film) -> [dict]:
+        """How each of a film's duplicates will be handled.
+        """
+        return [{
+            'file': os.path.basename(d.current.source_path),
+            'duplicate': d.duplicate.source_path,
+            'action': d.should.name,
+            'reason': d.reason
+        } for d in film.duplicate_decisions]
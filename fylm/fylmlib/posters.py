@@ -0,0 +1,228 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Poster cache for Fylm.
+
+This module downloads TMDb posters into a local cache, so that each poster
+is only downloaded once. Posters are stored by the hash of their contents,
+so identical images are only stored once, and the least recently used
+posters are removed once the cache grows beyond `posters.cache_size`.
+
+    posters: the main class exported by this module.
+"""
+
+from __future__ import unicode_literals, print_function
+from builtins import *
+try:
+    from urllib.parse import urljoin
+except ImportError:
+    from urlparse import urljoin
+import os
+import uuid
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import requests
+
+import fylmlib.config as config
+from fylmlib.console import console
+
+class posters:
+    """Main class for downloading and caching posters.
+
+    Each poster is stored as <digest>.jpg in cache_path, and refs/<poster_path>
+    holds the digest of a poster_path's image. A poster's mtime is updated
+    each time it is used, and is used to find the least recently used posters.
+
+    All methods are class methods, thus this class should never be instantiated.
+    """
+
+    # Folder that downloaded posters are kept in, under the working dir.
+    cache_path = '.cache.posters'
+
+    # Base URL that poster_paths are relative to.
+    base_url = 'https://image.tmdb.org/t/p/w185/'
+
+    # Downloads in progress, mapped from their poster_path.
+    _pending = {}
+    _executor = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, poster_path) -> str:
+        """Get the path to a cached poster, downloading it if it is not already
+        in the cache.
+
+        Args:
+            poster_path: (str) TMDb poster_path of a film.
+        Returns:
+            Path to the poster, or None if it could not be downloaded.
+        """
+        if not poster_path:
+            return None
+        cached = cls._lookup(poster_path)
+        if cached is not None:
+            return cached
+        try:
+            return cls._download(poster_path).result(timeout=config.posters.timeout)
+        except TimeoutError:
+            console.debug(f"Timed out downloading poster '{poster_path}'")
+        except Exception as e:
+            console.debug(f"Could not download poster '{poster_path}' ({e})")
+        return None
+
+    @classmethod
+    def prefetch(cls, poster_paths: [str]):
+        """Start downloading, in the background, any posters that are not
+        already in the cache, without waiting for them.
+
+        Args:
+            poster_paths: [str] TMDb poster_paths of films.
+        """
+        for poster_path in set(p for p in poster_paths if p):
+            if cls._lookup(poster_path) is None:
+                cls._download(poster_path)
+
+    @classmethod
+    def _lookup(cls, poster_path) -> str:
+        """Find a poster in the cache, and mark it as recently used.
+
+        Returns:
+            Path to the poster, or None if it is not in the cache.
+        """
+        try:
+            with open(cls._ref(poster_path), 'r') as f:
+                path = os.path.join(cls.cache_path, f'{f.read().strip()}.jpg')
+            os.utime(path)
+            return path
+        except (IOError, OSError):
+            # Missing, or the poster was evicted.
+            return None
+
+    @classmethod
+    def _download(cls, poster_path):
+        """Download a poster in the background, unless it is already being
+        downloaded.
+
+        Returns:
+            A Future for the path to the poster.
+        """
+        with cls._lock:
+            if poster_path in cls._pending:
+                return cls._pending[poster_path]
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=config.posters.workers)
+            future = cls._executor.submit(cls._fetch, poster_path)
+            cls._pending[poster_path] = future
+        future.add_done_callback(lambda _: cls._done(poster_path))
+        return future
+
+    @classmethod
+    def _done(cls, poster_path):
+        with cls._lock:
+            cls._pending.pop(poster_path, None)
+
+    @classmethod
+    def _fetch(cls, poster_path) -> str:
+        """Download a poster and add it to the cache.
+
+        Returns:
+            Path to the poster.
+        """
+        response = requests.get(urljoin(cls.base_url, poster_path), timeout=config.posters.timeout)
+        response.raise_for_status()
+        return cls._store(poster_path, response.content)
+
+    @classmethod
+    def _store(cls, poster_path, data) -> str:
+        """Add a poster's image to the cache, then evict old posters if the
+        cache is full.
+
+        Returns:
+            Path to the poster.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.join(cls.cache_path, f'{digest}.jpg')
+        os.makedirs(os.path.dirname(cls._ref(poster_path)), exist_ok=True)
+
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            cls._write(path, data)
+        cls._write(cls._ref(poster_path), digest.encode('ascii'))
+
+        cls._evict(keep=path)
+        return path
+
+    @classmethod
+    def _evict(cls, keep=None):
+        """Remove the least recently used posters until the cache is no larger
+        than posters.cache_size.
+
+        Args:
+            keep: (str) path to a poster that should not be removed.
+        """
+        limit = (config.posters.cache_size or 0) * 1024 * 1024
+        entries = []
+        for name in os.listdir(cls.cache_path):
+            path = os.path.join(cls.cache_path, name)
+            if name.endswith('.jpg') and path != keep:
+                try:
+                    st = os.stat(path)
+                    entries.append((st.st_mtime, st.st_size, path))
+                except OSError:
+                    pass
+        size = sum(e[1] for e in entries) + (os.path.getsize(keep) if keep else 0)
+
+        evicted = set()
+        for (_, entry_size, path) in sorted(entries):
+            if size <= limit:
+                break
+            try:
+                os.remove(path)
+                size -= entry_size
+                evicted.add(os.path.splitext(os.path.basename(path))[0])
+            except OSError:
+                pass
+
+        if len(evicted) == 0:
+            return
+        console.debug(f'Evicted {len(evicted)} posters from the cache')
+
+        # Remove refs to the evicted posters.
+        refs = os.path.join(cls.cache_path, 'refs')
+        for name in os.listdir(refs):
+            try:
+                with open(os.path.join(refs, name), 'r') as f:
+                    if f.read().strip() in evicted:
+                        os.remove(os.path.join(refs, name))
+            except (IOError, OSError):
+                pass
+
+    @classmethod
+    def _ref(cls, poster_path) -> str:
+        """Path to the file that holds the digest of a poster_path's image.
+        """
+        return os.path.join(cls.cache_path, 'refs', os.path.basename(poster_path.strip('/')))
+
+    @classmethod
+    def _write(cls, path, data):
+        """Write a file via a temp file, so that a partial file is never read.
+        """
+        tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
@@ -0,0 +1,351 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Media probing for Fylm.
+
+This module reads video track metadata from files using libmediainfo, and
+computes sampled content fingerprints of files. Both are persisted so that
+a file is only probed once while it is unchanged on disk.
+
+    probe: the main class exported by this module.
+    Metadata: the video track details read from a file.
+"""
+
+from __future__ import unicode_literals, print_function
+from builtins import *
+
+import os
+import sys
+import time
+import hashlib
+import sqlite3
+import threading
+from queue import Queue
+from collections import namedtuple
+from concurrent.futures import Future, TimeoutError, CancelledError
+
+from pymediainfo import MediaInfo
+
+import fylmlib.config as config
+
+# Video track details read from a file's metadata.
+Metadata = namedtuple('Metadata', ['width', 'height', 'codec', 'hdr_format', 'duration'])
+
+class probe:
+    """Main class for reading and caching media metadata.
+
+    Cached entries are keyed by (device, inode) and are only valid while the
+    file's size and mtime are unchanged, so a renamed or moved file on the
+    same device keeps its entry, and a modified file is probed again.
+    """
+
+    # SQLite database of probed metadata, kept between runs in the working dir.
+    cache_path = f'.cache.probe_py{sys.version_info[0]}.sqlite'
+
+    # Bytes read from each of the start, middle, and end of a file in fingerprint().
+    sample_size = 4 * 1024 * 1024
+
+    _conn = None
+    _lock = threading.Lock()
+
+    # Probes started by prefetch(), mapped from their path to a tuple of
+    # (future, deadline).
+    _pending = {}
+
+    # Probes waiting for a worker, and the worker threads. The workers are
+    # daemon threads, not a ThreadPoolExecutor, whose threads are joined at
+    # exit: a probe stuck on an unresponsive file (e.g. on NFS) must not keep
+    # Fylm from exiting.
+    _queue = Queue()
+    _workers = []
+
+    @classmethod
+    def metadata(cls, path) -> Metadata:
+        """Retrieve the video track metadata for a file, probing it only if
+        it is not already in the cache.
+
+        Args:
+            path: (str, utf-8) Path to the file to probe.
+        Returns:
+            A Metadata object, or None if the file has no video track.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        (hit, metadata) = cls._get(key)
+        if hit:
+            return metadata
+
+        # If the file is already being probed by prefetch(), wait for it, but
+        # not beyond the deadline for its batch.
+        with cls._lock:
+            pending = cls._pending.get(path)
+        if pending is not None:
+            (future, deadline) = pending
+            try:
+                return future.result(timeout=max(deadline - time.time(), 0))
+            except (TimeoutError, CancelledError):
+                return None
+
+        return cls._load(path, key)
+
+    @classmethod
+    def fingerprint(cls, path) -> str:
+        """Retrieve a sampled content fingerprint for a file, computing it only
+        if it is not already in the cache. The fingerprint is a hash of the
+        file's size and the first, middle, and last sample_size bytes, so
+        byte-identical copies can be detected without reading them in full.
+
+        Args:
+            path: (str, utf-8) Path to the file to fingerprint.
+        Returns:
+            A hex digest, or None if the file cannot be read.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        with cls._lock:
+            conn = cls._connect()
+            row = conn.execute('''SELECT digest FROM fingerprints
+                WHERE dev=? AND ino=? AND size=? AND mtime=?''', key).fetchone() if conn else None
+        if row is not None:
+            return row[0]
+
+        try:
+            digest = cls._fingerprint(path, st.st_size)
+        except (IOError, OSError):
+            return None
+
+        with cls._lock:
+            conn = cls._connect()
+            if conn is not None:
+                try:
+                    conn.execute('INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?)', key + (digest,))
+                    conn.commit()
+                except sqlite3.Error:
+                    pass
+        return digest
+
+    @classmethod
+    def prefetch(cls, paths: [str]):
+        """Start probing, in a bounded worker pool, the video files in each of
+        the given films whose resolution cannot be parsed from their name,
+        without waiting for them. Call this before the films are loaded, so
+        that the probes run concurrently rather than one at a time as each
+        film is checked.
+
+        The whole batch shares one deadline of `probe.timeout` seconds. Files
+        that are not probed by then are treated as having no metadata for the
+        rest of the run, rather than being probed again, and probes that have
+        not started by then are dropped.
+
+        Args:
+            paths: [str] paths of films (files or folders) that are about to be loaded.
+        """
+        # Import here to avoid circular imports.
+        from fylmlib.parser import parser
+        import fylmlib.operations as ops
+        from fylmlib.console import console
+
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(ops.dirops.get_files(path)[0])
+            elif os.path.isfile(path):
+                files.append(path)
+
+        deadline = time.time() + config.probe.timeout
+        started = 0
+        for path in files:
+            if (os.path.splitext(path)[1].lower() not in config.derived.video_exts
+                or parser.get_resolution(path) is not None):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+            if cls._get(key)[0]:
+                continue
+            with cls._lock:
+                if path in cls._pending:
+                    continue
+                while len(cls._workers) < config.probe.workers:
+                    worker = threading.Thread(target=cls._work, daemon=True)
+                    worker.start()
+                    cls._workers.append(worker)
+                future = Future()
+                cls._pending[path] = (future, deadline)
+            future.add_done_callback(lambda _, path=path: cls._done(path))
+            cls._queue.put((future, path, key, deadline))
+            started += 1
+
+        if started > 0:
+            console.debug(f'Probing metadata for {started} files')
+
+    @classmethod
+    def _work(cls):
+        """Worker thread loop for prefetch().
+        """
+        while True:
+            (future, path, key, deadline) = cls._queue.get()
+            # Nothing waits for a probe after its batch's deadline.
+            if time.time() >= deadline:
+                future.cancel()
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(cls._load(path, key))
+            except Exception as e:
+                future.set_exception(e)
+
+    @classmethod
+    def _done(cls, path):
+        with cls._lock:
+            cls._pending.pop(path, None)
+
+    @classmethod
+    def _load(cls, path, key) -> Metadata:
+        """Probe a file and store the result in the cache.
+
+        Args:
+            path: (str, utf-8) Path to the file to probe.
+            key: (tuple) (device, inode, size, mtime) of the file.
+        Returns:
+            A Metadata object, or None if the file has no video track.
+        """
+        metadata = cls._probe(path)
+        cls._set(key, metadata)
+        return metadata
+
+    @classmethod
+    def clear(cls):
+        """Remove all entries from the cache.
+        """
+        with cls._lock:
+            conn = cls._connect()
+            if conn is not None:
+                conn.execute('DELETE FROM probes')
+                conn.execute('DELETE FROM fingerprints')
+                conn.commit()
+
+    @classmethod
+    def _probe(cls, path) -> Metadata:
+        """Read the first video track's metadata from a file using libmediainfo.
+
+        Args:
+            path: (str, utf-8) Path to the file to probe.
+        Returns:
+            A Metadata object, or None if the file has no video track.
+        """
+        media_info = MediaInfo.parse(path,
+            library_file=os.path.join(os.path.abspath(os.path.dirname(__file__)), 'libmediainfo.0.dylib'))
+        for track in media_info.tracks:
+            if track.track_type == 'Video':
+                return Metadata(
+                    width=track.width,
+                    height=track.height,
+                    codec=track.format,
+                    hdr_format=track.hdr_format,
+                    duration=track.duration)
+        return None
+
+    @classmethod
+    def _fingerprint(cls, path, size) -> str:
+        """Hash a file's size and its start, middle, and end samples. Files
+        smaller than three samples are hashed in full.
+
+        Args:
+            path: (str, utf-8) Path to the file to fingerprint.
+            size: (int) Size of the file in bytes.
+        Returns:
+            A hex digest.
+        """
+        h = hashlib.blake2b(str(size).encode('ascii'), digest_size=16)
+        with open(path, 'rb') as f:
+            if size <= cls.sample_size * 3:
+                h.update(f.read())
+            else:
+                for offset in [0, (size - cls.sample_size) // 2, size - cls.sample_size]:
+                    f.seek(offset)
+                    h.update(f.read(cls.sample_size))
+        return h.hexdigest()
+
+    @classmethod
+    def _connect(cls):
+        """Open the cache database on first use. If caching is disabled in
+        config, an in-memory database is used for the current run only.
+        """
+        if cls._conn is None:
+            path = cls.cache_path if config.cache is True else ':memory:'
+            try:
+                cls._conn = sqlite3.connect(path, check_same_thread=False)
+                cls._conn.execute('''CREATE TABLE IF NOT EXISTS probes (
+                    dev INTEGER, ino INTEGER, size INTEGER, mtime INTEGER,
+                    found INTEGER, width INTEGER, height INTEGER, codec TEXT,
+                    hdr_format TEXT, duration REAL, PRIMARY KEY (dev, ino))''')
+                cls._conn.execute('''CREATE TABLE IF NOT EXISTS fingerprints (
+                    dev INTEGER, ino INTEGER, size INTEGER, mtime INTEGER,
+                    digest TEXT, PRIMARY KEY (dev, ino))''')
+            except sqlite3.Error:
+                # The cache is an optimization, so if it cannot be opened, probe every time.
+                cls._conn = None
+        return cls._conn
+
+    @classmethod
+    def _get(cls, key):
+        """Look up a cache entry.
+
+        Args:
+            key: (tuple) (device, inode, size, mtime) of the file.
+        Returns:
+            A tuple of (hit, Metadata or None).
+        """
+        with cls._lock:
+            conn = cls._connect()
+            if conn is None:
+                return (False, None)
+            row = conn.execute('''SELECT found, width, height, codec, hdr_format, duration
+                FROM probes WHERE dev=? AND ino=? AND size=? AND mtime=?''', key).fetchone()
+        if row is None:
+            return (False, None)
+        return (True, Metadata(*row[1:]) if row[0] else None)
+
+    @classmethod
+    def _set(cls, key, metadata):
+        """Store a cache entry, replacing any stale entry for the same inode.
+
+        Args:
+            key: (tuple) (device, inode, size, mtime) of the file.
+            metadata: (Metadata) Probed metadata, or None if there is no video track.
+        """
+        values = tuple(metadata) if metadata is not None else (None,) * len(Metadata._fields)
+        with cls._lock:
+            conn = cls._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute('INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    key + (metadata is not None,) + values)
+                conn.commit()
+            except sqlite3.Error:
+                pass
@@ -31,6 +31,11 @@ from fylmlib.console import console
 from fylmlib.subtitle import Subtitle
 from fylmlib.duplicates import duplicates
 from fylmlib.interactive import interactive
+from fylmlib.journal import journal
+from fylmlib.lease import lease
+from fylmlib.pipeline import Pipeline, Stage
+from fylmlib.background import Background
+from fylmlib.plans import plans
 from fylmlib.enums import Should
 import fylmlib.formatter as formatter
 import fylmlib.operations as ops
@@ -54,26 +59,146 @@ class processor:
             films: [Film] list of film objects to process.
         """
 
-        for film in films:
-            
-            # If we determine that this file should be suppressed in the console, 
-            # there's no value in continuing to route it.
-            if not cls.should_be_skipped(film):
-                # Route film to correct handler
-                cls.route(film)
-                
-        # If we are running in interactive mode, we need to handle the moves
-        # after all the lookups are completed in case we have long-running copy
-        # operations.
+        # If we are running in interactive mode, the moves are handled separately
+        # from the lookups, so that prompts aren't held up by long-running copy
+        # operations. With background_transfers, each film starts moving in the
+        # background as soon as it is confirmed, otherwise all of the films are
+        # moved once every lookup is completed.
         if config.interactive is True:
 
-            # If we're moving more than one film, print the move header.
-            queue_count = len(_move_queue)
-            c = console().pink(f"\n{'Copying' if config.safe_copy else 'Moving'}")
-            c.pink(f" {queue_count} {formatter.pluralize('file', queue_count)}...").print()
+            background = Background(cls.move) if config.background_transfers is True else None
+            moving = []
+            try:
+                for film in films:
 
-            # Process the entire queue
-            cls.process_move_queue()
+                    # Show the progress of films moving in the background before
+                    # prompting for the next film.
+                    if background is not None:
+                        background.print_status()
+                
+                    # If we determine that this file should be suppressed in the console, 
+                    # there's no value in continuing to route it. Films claimed by another
+                    # worker are also skipped.
+                    if not cls.should_be_skipped(film) and cls.claim(film):
+                        # Route film to correct handler
+                        cls.route(film)
+
+                    # Start moving the film, now that it has been confirmed.
+                    while background is not None and len(_move_queue) > 0:
+                        background.add(_move_queue.pop(0), film.title)
+
+                if background is not None:
+                    # Most films have already moved while prompting, so only
+                    # mention the ones that are still moving.
+                    remaining = background.remaining()
+                    if remaining > 0:
+                        c = console().pink(f"\nWaiting for {remaining} {formatter.pluralize('film', remaining)}")
+                        c.pink(f" to finish {'copying' if config.safe_copy else 'moving'}...").print()
+                    background.join()
+                else:
+                    # If we're moving more than one film, print the move header.
+                    queue_count = len(_move_queue)
+                    c = console().pink(f"\n{'Copying' if config.safe_copy else 'Moving'}")
+                    c.pink(f" {queue_count} {formatter.pluralize('file', queue_count)}...").print()
+
+                    # Process the entire queue
+                    cls.process_move_queue()
+            finally:
+                # If interrupted, don't start moving any more films. A film that
+                # is still moving keeps its lease, so no other worker claims it
+                # before this process exits; the lease then expires.
+                if background is not None:
+                    moving = [film for (film, _) in background.cancel()]
+                for film in films:
+                    if not any(film is m for m in moving):
+                        lease.release(film.original_path)
+
+        # Otherwise, run each film through the pipeline, so that lookups and
+        # transfers for different films can overlap.
+        else:
+            try:
+                cls.pipeline().run(films)
+            finally:
+                # If interrupted, the films still in progress are not finished,
+                # so release their leases here.
+                for film in films:
+                    lease.release(film.original_path)
+
+    @classmethod
+    def pipeline(cls) -> Pipeline:
+        """Build the non-interactive processing pipeline. Each stage takes a
+        film (or a film and its queued moves) and returns what the next stage
+        needs, or None if the film should not be processed any further. The
+        number of workers for each stage is set in config.
+
+        Returns:
+            A Pipeline object.
+        """
+
+        def discover(film):
+            if cls.should_be_skipped(film) or not cls.claim(film):
+                return None
+            # Print film header to console.
+            console().print_film_header(film)
+            return film
+
+        def parse(film):
+            # Load the film's files, so later stages do not wait on the disk.
+            film.all_valid_files
+            film.video_files
+            return film
+
+        def lookup(film):
+            return film if cls.lookup(film) else None
+
+        def dedupe(film):
+            return film if cls.dedupe(film) else None
+
+        def plan(film):
+            return cls.plan(film)
+
+        def transfer(entry):
+            (film, queued_ops) = entry
+            return (film, queued_ops[0].dst, cls.transfer(film, queued_ops))
+
+        def notify(result):
+            (film, dst_path, did_move) = result
+            if did_move:
+                cls.finalize(film, dst_path)
+            # All of the film's file operations are complete, whether or not they succeeded.
+            journal.commit(film)
+            return film
+
+        workers = config.workers or {}
+        return Pipeline([Stage(name, func, workers.get(name, 1)) for (name, func) in [
+            ('discover', discover),
+            ('parse', parse),
+            ('lookup', lookup),
+            ('dedupe', dedupe),
+            ('plan', plan),
+            ('transfer', transfer),
+            ('notify', notify)]],
+            finish=lambda film: lease.release(film.original_path))
+
+    @classmethod
+    def claim(cls, film: Film) -> bool:
+        """Claim a film with a lease, so that other workers sharing the same
+        source dirs do not process it too. Always True if leases are disabled.
+
+        Args:
+            film: (Film) film object to claim.
+        Returns:
+            bool: True if the film should be processed by this worker, otherwise False.
+        """
+        if not lease.acquire(film.original_path):
+            return False
+
+        # Another worker may have finished processing the film before it was claimed.
+        if not os.path.exists(film.original_path):
+            lease.release(film.original_path)
+            return False
+
+        return True
 
     @classmethod
     def route(cls, film: Film):
@@ -90,22 +215,61 @@ class processor:
             # If the film is rejected via the interactive flow, skip.
             if interactive.lookup(film) is False:
                 return
-        else:
-            # Search TMDb for film details (if enabled).
-            film.search_tmdb()
+        elif not cls.lookup(film):
+            return
+
+        if not cls.dedupe(film):
+            return
+
+        entry = cls.plan(film)
+        if entry is not None:
+            _move_queue.append(entry)
+
+        # If we're not running in interactive mode, do all the moving 
+        # on a first-in-first out basis.
+        if config.interactive is False:
+            cls.process_move_queue()
+
+    @classmethod
+    def lookup(cls, film: Film) -> bool:
+        """Search TMDb for film details (if enabled), and print the results.
+        Not used in interactive mode.
+
+        Args:
+            film: (Film) film object to look up.
+        Returns:
+            bool: True if the film should continue to be processed, otherwise False.
+        """
+
+        # When applying a plan, the film has already been looked up.
+        if config.apply:
+            return plans.restore(film)
+
+        film.search_tmdb()
+
+        # If the film still should be ignored after looking up, skip.
+        if film.should_ignore is True:
+            console().print_skip(film)
+            return False
+
+        # If the lookup was successful, print the results to the console.
+        console().print_search_result(film)
+        return True
+
+    @classmethod
+    def dedupe(cls, film: Film) -> bool:
+        """If duplicate checking is enabled and the film is a duplicate, check
+        which duplicates we want to keep. When getting `verified_duplicate_files`,
+        duplicate upgrade/ignore checking is also executed. In interactive mode
+        the unwanted duplicates are renamed here, otherwise they are renamed
+        when the film is transferred.
+
+        Args:
+            film: (Film) film object to check for duplicates.
+        Returns:
+            bool: True if the film should continue to be processed, otherwise False.
+        """
 
-            # If the film still should be ignored after looking up, skip.
-            if film.should_ignore is True:
-                console().print_skip(film)
-                return
-            else:
-                # If the lookup was successful, print the results to the console.
-                console().print_search_result(film)
-
-        # If duplicate checking is enabled and the film is a duplicate, rename
-        # all the duplicates we do not want to keep so they can be deleted later.
-        # When getting `verified_duplicate_files`, duplicate upgrade/ignore checking
-        # is also executed.
         if len(film.verified_duplicate_files) > 0:
 
             console().print_duplicates(film)
@@ -113,27 +277,43 @@ class processor:
             if config.interactive is True:
 
                 # If interactive mode is enabled, a False return here
-                # indicates we no longer want to keep this file, so
-                # return.
-                if not interactive.handle_duplicates(film):
-                    return
-            else:
-                duplicates.rename_unwanted(film)
+                # indicates we no longer want to keep this file.
+                return interactive.handle_duplicates(film)
+
+        return True
 
+    @classmethod
+    def plan(cls, film: Film):
+        """Rename a film's files and plan their moves.
+
+        Args:
+            film: (Film) film object to plan.
+        Returns:
+            A tuple of (film, [_QueuedMoveOperation]), or None if there is
+            nothing to move.
+        """
+
+        entry = None
         if not film.should_ignore or config.interactive is True or config.duplicates.force_overwrite:
             # If it is a file and as a valid extension, process it as a file
             if film.is_file and film.all_valid_files[0].has_valid_ext:
-                cls.prepare_file(film)
+                entry = cls.prepare_file(film)
 
             # Otherwise if it's a folder, process it as a folder containing
             # potentially multiple related files.
             elif film.is_folder:
-                cls.prepare_folder(film)
+                entry = cls.prepare_folder(film)
 
-        # If we're not running in interactive mode, do all the moving 
-        # on a first-in-first out basis.
-        if config.interactive is False:
-            cls.process_move_queue()
+        # If writing a plan, record the film's planned moves.
+        if entry is not None and config.plan:
+            plans.add(*entry)
+
+        # Duplicates renamed interactively for a film that will not be moved
+        # are not part of a transfer, so should not be rolled back.
+        if entry is None:
+            journal.commit(film)
+
+        return entry
 
     @classmethod
     def should_be_skipped(cls, film: Film):
@@ -162,49 +342,83 @@ class processor:
         global _move_queue
 
         # Enumerate the move/copy queue and execute
-        for film, queued_ops in _move_queue:
+        for entry in _move_queue:
+            cls.move(entry)
 
-            if config.interactive is True:
-                console().print_film_header(film)
+        # When move/copy operations are complete, empty the queue.
+        _move_queue = []
+
+    @classmethod
+    def move(cls, entry):
+        """Move a film that was queued in interactive mode, and finalize it.
 
-            copied_files = 0
+        Args:
+            entry: (tuple) the film and its [_QueuedMoveOperation].
+        """
 
-            # Determine the destination path for the film
-            dst_path = queued_ops[0].dst
+        (film, queued_ops) = entry
 
-            if film.source_path == dst_path:
-                console().indent().dark_gray('Already renamed').print()
+        # If the move is successful...
+        if cls.transfer(film, queued_ops):
+            cls.finalize(film, queued_ops[0].dst)
 
-            for move in queued_ops:
+        # All of the film's file operations are complete, whether or not they succeeded.
+        journal.commit(film)
 
-                # Execute the move/copy and print details
-                console().print_move_or_copy(move.file.parent_film.source_path, dst_path, move.dst)
-                copied_files += move.do()
+        if config.interactive is True:
+            # Print blank line to separate next film
+            console().print()
 
-            # If the move is successful...
-            if copied_files == len(queued_ops):
+    @classmethod
+    def transfer(cls, film: Film, queued_ops: ['_QueuedMoveOperation']) -> bool:
+        """Execute a film's queued moves/copies.
 
-                for file in film.all_valid_files:
+        Args:
+            film: (Film) film object to move.
+            queued_ops: [_QueuedMoveOperation] the film's planned moves.
+        Returns:
+            bool: True if all of the film's files were moved, otherwise False.
+        """
 
-                    # Update the counter
-                    if file.is_video:
-                        counter.add(1)
+        if config.interactive is True:
+            console().print_film_header(film)
 
-                        # Notify Pushover
-                        notify.pushover(file.parent_film)
+        copied_files = 0
 
-                    # Clean up the source dir (only executes if it's a dir)
-                    cls.cleanup_dir(file.parent_film)
+        # Determine the destination path for the film
+        dst_path = queued_ops[0].dst
 
-                    # Update the film's source_path its new location once all files have been moved.
-                    file.source_path = dst_path
+        if film.source_path == dst_path:
+            console().indent().dark_gray('Already renamed').print()
 
-            if config.interactive is True:
-                # Print blank line to separate next film
-                console().print()
+        # If an identically named duplicate exists, check the upgrade table to see if it
+        # is OK for upgrade. This is the same for every file in the film.
+        ok_to_upgrade = len(duplicates.find_exact(film)) > 0 and len(duplicates.find_upgradable(film)) > 0
 
-        # When move/copy operations are complete, empty the queue.
-        _move_queue = []
+        # Rename the duplicates we do not want to keep so they can be deleted
+        # once the film is moved, as part of the film's journaled transaction.
+        if config.interactive is False:
+            duplicates.rename_unwanted(film)
+
+        for move in queued_ops:
+
+            # Execute the move/copy and print details
+            console().print_move_or_copy(move.file.parent_film.source_path, dst_path, move.dst)
+            did_move = move.do(ok_to_upgrade)
+            copied_files += did_move
+
+            # Files moved while applying a plan are not duplicates of later films in it.
+            if did_move and config.apply:
+                plans.written(move.dst)
+
+        if copied_files != len(queued_ops):
+            return False
+
+        # Clean up upgraded duplicates once all the files in the film have been moved
+        if len(film.duplicate_files) > 0 and config.interactive is False:
+            duplicates.delete_upgraded(film)
+
+        return True
 
     @classmethod
     def prepare_file(cls, film: Film):
@@ -212,13 +426,17 @@ class processor:
 
         Args:
             film: (Film) film object to process.
+        Returns:
+            A tuple of (film, [_QueuedMoveOperation]).
         """
 
-        global _move_queue
-
         # Get the main file
         file = film.all_valid_files[0]
 
+        # Links leave the source in place (e.g. for seeding), so it must keep its name.
+        if ops.fileops.leaves_source(file.destination_path):
+            return (film, [_QueuedMoveOperation(file)])
+
         # Rename the source file to its new filename
         ops.fileops.rename(file.source_path, file.new_filename_and_ext)
 
@@ -233,7 +451,7 @@ class processor:
         # Move the file. (Only executes in live mode).
         # If this film is a duplicate and is set to replace an existing film, suppress
         # the overwrite warning.
-        _move_queue.append((film, [_QueuedMoveOperation(film.all_valid_files[0])]))
+        return (film, [_QueuedMoveOperation(film.all_valid_files[0])])
 
     @classmethod
     def prepare_folder(cls, film: Film):
@@ -241,6 +459,8 @@ class processor:
 
         Args:
             film: (Film) film object to process.
+        Returns:
+            A tuple of (film, [_QueuedMoveOperation]).
         """
 
         # Create a list to hold queued files. This is used to guarantee
@@ -275,7 +495,12 @@ class processor:
                 # sequentially to prevent clobbering.   
                 dst = f'{new_filename}.{uniqueness_map.count(dst) - 1}{ext}'
             
-            # Rename the source file to its new filename
+            # Rename the source file to its new filename, unless it is linked,
+            # which leaves the source in place (e.g. for seeding).
+            if ops.fileops.leaves_source(dst):
+                move_constructor[1].append(_QueuedMoveOperation(file, dst))
+                continue
+
             ops.fileops.rename(file.source_path, os.path.basename(dst))
 
             # Update source with the newly renamed path, derived from destination name, in 
@@ -289,8 +514,38 @@ class processor:
             # the overwrite warning.
             move_constructor[1].append(_QueuedMoveOperation(file, dst))
 
-        # Add the current film's queued files to the move queue.
-        _move_queue.append(move_constructor)
+        # Return the current film's queued files, to be added to the move queue.
+        return move_constructor
+
+    @classmethod
+    def finalize(cls, film: Film, dst_path: str):
+        """Finish processing a film once all of its files have been moved.
+        Runs once per film, regardless of how many files it contains.
+
+        Args:
+            film: (Film) film object that was moved.
+            dst_path: (str, utf-8) the film's new location.
+        """
+
+        # Update the counter for each video file.
+        video_count = len([f for f in film.all_valid_files if f.is_video])
+        counter.add(video_count)
+
+        # Notify Pushover
+        if video_count > 0:
+            notify.pushover(film)
+
+        # Ask Plex to scan the folder the film was moved to.
+        notify.plex(os.path.dirname(dst_path))
+
+        # Clean up the source dir (only executes if it's a dir), unless it was
+        # linked, which would leave the links dangling.
+        if not ops.fileops.leaves_source(dst_path):
+            cls.cleanup_dir(film)
+
+        # Update the film's source_path its new location once all files have been moved.
+        for file in film.all_valid_files:
+            file.source_path = dst_path
 
     @classmethod
     def cleanup_dir(cls, film: Film):
@@ -305,8 +560,8 @@ class processor:
         if not film.is_folder:
             return
 
-        # Recursively delete unwanted files and set the count.
-        deleted_files_count = ops.dirops.delete_unwanted_files(film.source_path)
+        # Delete unwanted files found when the film was loaded, and set the count.
+        deleted_files_count = ops.dirops.delete_unwanted_files(film.source_path, film.invalid_files)
 
         # Print results of removing unwanted files.
         if config.remove_unwanted_files and deleted_files_count > 0:
@@ -335,24 +590,25 @@ class _QueuedMoveOperation(object):
         self.file = file
         self.dst = dst or file.destination_path
     
-    def do(self):
+    def do(self, ok_to_upgrade=False):
         """Passthrough function to call ops.fileops.safe_move()
+
+        Args:
+            ok_to_upgrade: (bool) True if this file is OK to replace an existing one.
         """
 
         if not os.path.exists(self.file.source_path):
             console().yellow().indent(f'\'{os.path.basename(self.file.source_path)}\' no longer exists or cannot be accessed').print()
             return False
 
-        # If an identically named duplicate exists, check the upgrade table to see if it is OK for upgrade
-        ok_to_upgrade = len(duplicates.find_exact(self.file.parent_film)) > 0 and len(duplicates.find_upgradable(self.file.parent_film)) > 0
+        # Journal the move before executing it, so it can be recovered if interrupted
+        tx = journal.tx(self.file.parent_film)
+        journal.record(tx, 'move', src=self.file.source_path, dst=self.file.destination_path)
 
         # Execute the move
-        self.file.did_move = ops.fileops.safe_move(self.file.source_path, self.file.destination_path, ok_to_upgrade)
+        self.file.did_move = ops.fileops.safe_move(self.file.source_path, self.file.destination_path, ok_to_upgrade, tx)
 
-        # Clean up duplicates if all the files in the parent film have been moved
-        if (len(self.file.parent_film.duplicate_files) > 0 
-            and config.interactive is False 
-            and len(list(filter(lambda m: m.did_move == False, self.file.parent_film.all_valid_files))) == 0):
-            duplicates.delete_upgraded(self.file.parent_film)
+        if self.file.did_move:
+            journal.record(tx, 'moved', src=self.file.source_path, dst=self.file.destination_path)
 
         return self.file.did_move
@@ -59,6 +59,55 @@ import os
 
 from fylmlib.languages import languages
 
+class _LanguageDetector:
+    """A precompiled matcher for language names and codes in subtitle paths.
+
+    Every language name and code is compiled into a single case-insensitive
+    alternation, mapped back to its language with a token dictionary. This
+    is built once when the module is loaded, instead of compiling a pattern
+    per language for every subtitle.
+    """
+    def __init__(self, languages):
+
+        # Map each lowercase name or code to its (priority, language). Priority
+        # follows the order of `languages`, so that the first language in the
+        # list wins when more than one language is found in a path.
+        self._tokens = {}
+        for i, lang in enumerate(languages):
+            for token in list(filter(None, lang.names)) + [lang.code]:
+                self._tokens.setdefault(token.lower(), (i, lang))
+
+        # Longer tokens are tried first so that 'english' is preferred over 'en'
+        # when both could match at the same position.
+        alternation = '|'.join(re.escape(t) for t in sorted(self._tokens, key=len, reverse=True))
+        self._pattern = re.compile(r'\.(?P<lang>(?P<token>' + alternation + r')(?:-\w+)?\b)', re.I)
+
+    def detect(self, path):
+        """Detect the language of a subtitle path.
+
+        Args:
+            path: (str, utf-8) Path or filename of the subtitle.
+        Returns:
+            A (code, language, captured) tuple for the highest priority language
+            found in the path, or None if no language is found.
+        """
+        best = None
+        for match in self._pattern.finditer(path):
+            found = self._tokens.get(match.group('token').lower())
+            if found is not None and (best is None or found[0] < best[0][0]):
+                best = (found, match.group('lang'))
+
+        if best is None:
+            return None
+
+        ((_, lang), captured) = best
+
+        # Capitalize the first letter of the captured string, e.g. 'english-sdh' becomes 'English-sdh'.
+        return (lang.code, lang.primary_name, captured[:1].upper() + captured[1:])
+
+# Build the detector once, when the module is loaded.
+_detector = _LanguageDetector(languages)
+
 class Subtitle:
     """A subtitle object that contains information about its language.
 
@@ -79,37 +128,11 @@ class Subtitle:
         # The language string captured from the original filename, e.g. 'english' or 'en'.
         self.captured = None
         
-        # First we loop through languages to determine if the path contains
-        # a descriptive language string, e.g. 'english', 'dutch', or 'fr'
-        for lang in languages:
-            
-            patterns = []
-                
-            # Compile patterns that matches language strings and codes, case insensitive.
-            for n in list(filter(None, lang.names)):
-                patterns.append(re.compile(r'\.(?P<lang>' + re.escape(n).lower() + r'(?:-\w+)?\b)', re.I))
-            patterns.append(re.compile(r'\.(?P<lang>' + re.escape(lang.code) + r'(?:-\w+)?\b)', re.I))
-            
-            # Iterate the array of patterns that we want to check for.
-            for p in patterns:
-                
-                # Search for rx match.
-                match = re.search(p, path)
-                if match is not None and match.group('lang') is not None:
-                
-                    # If a match exists, convert it to lowercase and save the entire
-                    # captured string.
-                    self.captured = match.group('lang')[:1].upper() + match.group('lang')[1:]
-
-                    # If we find a match, set the values of the subtitle, and break.
-                    self.code = lang.code
-                    self.language = lang.primary_name
-                
-                    break
-
-            # Break from parent if captured is set.
-            if self.captured is not None:
-                break
+        # Look up the language string in a single pass of the precompiled detector,
+        # e.g. 'english', 'dutch', or 'fr'.
+        match = _detector.detect(path)
+        if match is not None:
+            (self.code, self.language, self.captured) = match
 
     def insert_lang(self, path):
         """Returns a new path that includes the captured language string.
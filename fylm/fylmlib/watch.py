@@ -0,0 +1,476 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Watch mode for Fylm.
+
+This module keeps Fylm running, and processes new films as soon as they
+arrive in the source dirs, so that config, caches and the list of existing
+films are only loaded once. Changes are detected with inotify on Linux, or
+by periodically scanning the source dirs elsewhere. Paths submitted through
+the control socket are processed as soon as they are received.
+
+    watch: the main class exported by this module.
+"""
+
+from __future__ import unicode_literals, print_function
+from builtins import *
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from queue import Queue
+
+import fylmlib.config as config
+from fylmlib.console import console
+from fylmlib.processor import processor
+from fylmlib.control import control
+import fylmlib.operations as ops
+import fylmlib.counter as counter
+import fylmlib.notify as notify
+
+class watch:
+    """Main class for watching source dirs and processing new films.
+
+    An item (a file or folder in a source dir) is processed once it appears
+    to be complete: the size and mtime of everything in it have not changed
+    for config.watch_settle seconds, and (where /proc is available) no
+    process has any of its files open for writing. Changes caused by
+    processing an item are ignored, so it is not processed again.
+
+    All methods are class methods, thus this class should never be instantiated.
+    """
+
+    # Items waiting to be processed, mapped to the time they last changed.
+    _pending = {}
+
+    # Snapshot of each item's mtime, used when scanning instead of using inotify.
+    _snapshot = {}
+
+    # Each queued item's signature (see _signature), when it was last checked.
+    _signatures = {}
+
+    # Jobs submitted through the control socket, waiting to be processed.
+    _jobs = Queue()
+
+    # Pipe written to when a job is submitted, to wake the watch loop.
+    # Created when the watch loop starts.
+    _wake = None
+
+    @classmethod
+    def run(cls):
+        """Watch the source dirs until interrupted, processing new films as
+        they arrive. Items already in the source dirs are processed first.
+        """
+        try:
+            notifier = _Inotify(config.source_dirs)
+            console.debug('Watching source dirs using inotify')
+        except (OSError, AttributeError) as e:
+            notifier = None
+            console.debug(f'inotify is not available ({e}), scanning source dirs every {config.watch_interval}s')
+
+        console().pink(f"\nWatching for new films...").print()
+
+        # Queue everything that is already in the source dirs.
+        for item in cls._items():
+            cls._changed(item)
+        cls._snapshot = cls._stat_items()
+
+        if cls._wake is None:
+            cls._wake = os.pipe()
+
+        # Accept paths submitted by other invocations through the control socket.
+        if config.control is True:
+            control.serve(cls.submit)
+
+        while True:
+            for item in cls._wait(notifier, cls._next_timeout()):
+                cls._changed(item)
+
+            # Process submitted paths first, then items that are ready.
+            batches = [(job.paths, job) for job in cls._submitted()]
+            ready = cls._ready()
+            if len(ready) > 0:
+                batches.append((ready, None))
+
+            processed = set()
+            for (paths, job) in batches:
+                count = 0
+                processed.update(paths)
+                if job is not None:
+                    console.tee(job.output)
+                try:
+                    films = cls.films(paths, discover=(job is not None))
+                    processed.update(f.original_path for f in films)
+                    count = cls.process(films)
+                except Exception as e:
+                    # Keep watching. The batch's items are only processed
+                    # again if they change.
+                    console().error(f'{type(e).__name__}: {e}').print()
+                    if config.debug or config.errors:
+                        import traceback
+                        traceback.print_exc()
+                finally:
+                    if job is not None:
+                        console.tee(None)
+                        job.finish(count)
+
+            # Processed items are no longer pending, and changes to them were
+            # made by processing them, so only queue changes to other items.
+            if len(batches) > 0:
+                for item in processed:
+                    cls._pending.pop(item, None)
+                    cls._signatures.pop(item, None)
+                for item in cls._wait(notifier, 0):
+                    if item not in processed:
+                        cls._changed(item)
+
+    @classmethod
+    def submit(cls, job):
+        """Queue paths submitted through the control socket to be processed,
+        and wake the watch loop. Called from the control socket's threads.
+
+        Args:
+            job: (Job) paths to process.
+        """
+        cls._jobs.put(job)
+        os.write(cls._wake[1], b'\0')
+
+    @classmethod
+    def films(cls, paths, discover=False) -> ['Film']:
+        """Load the films in a batch of paths.
+
+        Args:
+            paths: [str] paths to load.
+            discover: (bool) True if the paths were submitted as source dirs
+                      (or a single file), which are searched for films the
+                      same way as --source, otherwise each path is a film.
+        Returns:
+            A list of films, sorted by title.
+        """
+
+        # Import Film here to avoid circular import conflicts.
+        from fylmlib.film import Film
+
+        paths = [p for p in paths if os.path.exists(p)]
+        if discover is True:
+            return ops.dirops.get_new_films(paths)
+
+        films = [Film(p) for p in paths]
+        films.sort(key=lambda x: x.title.lower())
+        return films
+
+    @classmethod
+    def process(cls, films) -> int:
+        """Process a batch of films as if Fylm had been run on them, keeping
+        the list of existing films up to date with the films that were moved.
+
+        Args:
+            films: [Film] films to process.
+        Returns:
+            The number of films moved.
+        """
+
+        counter.count = 0
+
+        if len(films) == 0:
+            return 0
+
+        processor.iterate(films)
+
+        # Films that were moved (and duplicates that were replaced) change the
+        # existing films used for duplicate checking.
+        moved = [f for f in films if any(file.did_move for file in f.all_valid_files)]
+        ops.dirops.refresh_existing_films([f.destination_path if config.use_folders
+            else file.destination_path for f in moved for file in f.video_files])
+
+        # Wake the notification dispatcher without waiting. Digests are still
+        # sent every notifications.batch_minutes, if set.
+        notify.flush()
+
+        console().print_exit(counter.count)
+        return counter.count
+
+    @classmethod
+    def _submitted(cls) -> ['Job']:
+        """Get all of the jobs that have been submitted, without waiting.
+        """
+        jobs = []
+        while not cls._jobs.empty():
+            jobs.append(cls._jobs.get())
+        return jobs
+
+    @classmethod
+    def _items(cls) -> [str]:
+        """List the items in each source dir.
+        """
+        items = []
+        for path in config.source_dirs:
+            try:
+                items += [os.path.join(path, f) for f in ops.dirops.sanitize_dir_list(os.listdir(path))]
+            except OSError:
+                continue
+        return items
+
+    @classmethod
+    def _stat_items(cls) -> dict:
+        """Map each item in the source dirs to its mtime.
+        """
+        snapshot = {}
+        for item in cls._items():
+            try:
+                snapshot[item] = os.stat(item).st_mtime_ns
+            except OSError:
+                continue
+        return snapshot
+
+    @classmethod
+    def _wait(cls, notifier, timeout) -> set:
+        """Wait for items in the source dirs to change.
+
+        Args:
+            notifier: (_Inotify) inotify watcher, or None to scan the source dirs.
+            timeout: (float) seconds to wait, or None to wait until something changes.
+        Returns:
+            A set of items that are new or have changed.
+        """
+        if notifier is None:
+            timeout = min(timeout, config.watch_interval) if timeout is not None else config.watch_interval
+
+        # Also wake when a job is submitted.
+        wake = [cls._wake[0]] if cls._wake is not None else []
+        fds = wake + ([notifier.fd] if notifier is not None else [])
+        if len(set(wake) & set(select.select(fds, [], [], timeout)[0])) > 0:
+            os.read(cls._wake[0], 4096)
+
+        if notifier is not None:
+            return notifier.read(0)
+
+        # Compare the source dirs to the last snapshot.
+        snapshot = cls._stat_items()
+        changed = set(i for i, mtime in snapshot.items() if cls._snapshot.get(i) != mtime)
+        cls._snapshot = snapshot
+        return changed
+
+    @classmethod
+    def _changed(cls, item):
+        """Queue an item, or restart its wait if it is already queued.
+        """
+        if item not in cls._pending:
+            cls._signatures[item] = cls._signature(item)
+        cls._pending[item] = time.time()
+
+    @classmethod
+    def _ready(cls) -> [str]:
+        """Get the queued items that have not changed for long enough to be
+        processed, and appear to be complete. Items that no longer exist are
+        dropped, and items that are still being written are queued again.
+        """
+        now = time.time()
+        for item in [i for i in cls._pending if not os.path.exists(i)]:
+            del cls._pending[item]
+            cls._signatures.pop(item, None)
+
+        ready = []
+        for item in [i for i, t in cls._pending.items() if now - t >= config.watch_settle]:
+            if cls.is_complete(item):
+                ready.append(item)
+            else:
+                cls._pending[item] = now
+        return ready
+
+    @classmethod
+    def is_complete(cls, item) -> bool:
+        """Determine whether an item has finished being written, i.e. it has
+        not changed since it was last checked, and none of its files are
+        open for writing.
+
+        Args:
+            item: (str, utf-8) path of a file or folder in a source dir.
+        Returns:
+            True if the item appears to be complete, otherwise False.
+        """
+        signature = cls._signature(item)
+        if signature != cls._signatures.get(item):
+            console.debug(f"Waiting for '{os.path.basename(item)}' to stop changing")
+            cls._signatures[item] = signature
+            return False
+
+        if _open_for_writing(signature[3]):
+            console.debug(f"Waiting for '{os.path.basename(item)}' to be closed")
+            return False
+
+        return True
+
+    @classmethod
+    def _signature(cls, item) -> tuple:
+        """Get the total size, latest mtime, and number of files in an item,
+        which change while anything in it is being written.
+
+        Args:
+            item: (str, utf-8) path of a file or folder in a source dir.
+        Returns:
+            A tuple of (size, mtime, count, paths).
+        """
+        paths = [item] if not os.path.isdir(item) else [
+            os.path.join(root, f) for root, _, files in os.walk(item) for f in files]
+        size = mtime = 0
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            size += st.st_size
+            mtime = max(mtime, st.st_mtime_ns)
+        return (size, mtime, len(paths), tuple(sorted(paths)))
+
+    @classmethod
+    def _next_timeout(cls):
+        """Seconds until the next queued item is ready, or None if nothing
+        is queued.
+        """
+        if len(cls._pending) == 0:
+            return None
+        return max(min(cls._pending.values()) + config.watch_settle - time.time(), 0)
+
+def _open_for_writing(paths) -> bool:
+    """Determine whether any other process has any of the specified files open
+    for writing, by inspecting each process's file descriptors in /proc.
+    Processes that cannot be inspected (e.g. those owned by other users) are
+    skipped, and if /proc is not available, this is always False.
+
+    Args:
+        paths: [str] paths of files to check.
+    Returns:
+        True if any of the files are open for writing, otherwise False.
+    """
+    if not os.path.isdir('/proc') or len(paths) == 0:
+        return False
+
+    targets = set(os.path.realpath(p) for p in paths)
+    for pid in (p for p in os.listdir('/proc') if p.isdigit() and int(p) != os.getpid()):
+        try:
+            fds = os.listdir(f'/proc/{pid}/fd')
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                if os.readlink(f'/proc/{pid}/fd/{fd}') not in targets:
+                    continue
+                with open(f'/proc/{pid}/fdinfo/{fd}') as f:
+                    flags = int(next(l for l in f if l.startswith('flags:')).split()[1], 8)
+            except (OSError, StopIteration, ValueError):
+                continue
+            if flags & (os.O_WRONLY | os.O_RDWR):
+                return True
+    return False
+
+class _Inotify(object):
+    """Minimal inotify wrapper, using libc directly, that watches each source
+    dir and all of its subdirs, and reports which item in a source dir changed.
+    """
+
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM
+        | IN_MOVED_TO | IN_CREATE | IN_DELETE)
+
+    _event = struct.Struct('iIII')
+
+    def __init__(self, roots):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, 'inotify is only available on Linux')
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.roots = [os.path.normpath(r) for r in roots]
+        self._wds = {}
+        for root in self.roots:
+            self._add(root)
+
+    def _add(self, path):
+        """Watch a dir and all of its subdirs.
+        """
+        for root, dirs, _ in os.walk(path):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(root), self.MASK)
+            if wd >= 0:
+                self._wds[wd] = root
+
+    def _item(self, path):
+        """Get the item in a source dir that contains path, or None if path is
+        a source dir.
+        """
+        for root in self.roots:
+            rel = os.path.relpath(path, root)
+            if not rel.startswith(os.pardir) and rel != os.curdir:
+                return os.path.join(root, rel.split(os.sep)[0])
+        return None
+
+    def read(self, timeout=None) -> set:
+        """Wait for changes, then read all pending events.
+
+        Args:
+            timeout: (float) seconds to wait for a change, or None to wait indefinitely.
+        Returns:
+            A set of items in the source dirs that changed.
+        """
+        items = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return items
+
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                (wd, mask, _, length) = self._event.unpack_from(data, offset)
+                offset += self._event.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+
+                if mask & self.IN_Q_OVERFLOW:
+                    # Events were lost, so treat everything as changed.
+                    items.update(watch._items())
+                    continue
+                if mask & self.IN_IGNORED:
+                    self._wds.pop(wd, None)
+                    continue
+
+                if wd not in self._wds:
+                    continue
+                path = os.path.join(self._wds[wd], name)
+                if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._add(path)
+                item = self._item(path)
+                if item is not None and len(ops.dirops.sanitize_dir_list([os.path.basename(item)])) > 0:
+                    items.add(item)
+        return items
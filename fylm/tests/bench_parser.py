@@ -0,0 +1,121 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Parser benchmark over the test film corpus.
+
+Parses every path in files.json and files_no_unicode.json and reports the
+overall throughput of parser.parse_many() and the cost of each parsed
+attribute, so that parser regressions are caught before they reach a real
+library run.
+
+Usage:
+    python bench_parser.py [--rounds N] [--processes N] [--min-rate PATHS_PER_SEC]
+
+If --min-rate is specified and the serial throughput falls below it, the
+benchmark exits with a non-zero status.
+"""
+
+from __future__ import unicode_literals, print_function
+from builtins import *
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+
+# Add the cwd to the path so we can load fylmlib modules.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+fixtures = ['files.json', 'files_no_unicode.json']
+
+def parse_args():
+    """Parse the benchmark args.
+    """
+    args = argparse.ArgumentParser(description='Benchmark the fylm parser.')
+    args.add_argument('--rounds', type=int, default=5, help='Number of times to parse the corpus')
+    args.add_argument('--processes', type=int, default=None, help='Worker processes for the pooled run (default: one per CPU)')
+    args.add_argument('--min-rate', type=float, default=0, help='Fail if serial paths/second falls below this value')
+    return args.parse_args()
+
+def load_corpus():
+    """Load all test film paths from the json fixtures.
+
+    Returns:
+        A list of relative paths, in the form of 'dir/filename' or 'filename'.
+    """
+    paths = []
+    for fixture in fixtures:
+        with io.open(os.path.join(os.path.dirname(__file__), fixture), mode='r', encoding='utf-8') as f:
+            for test_film in json.load(f)['test_films']:
+                for tf in test_film['files']:
+                    paths.append(os.path.join('#new', test_film.get('dir', ''), tf['filename']))
+    return paths
+
+def timed(func, rounds):
+    """Run func a number of times and return the best elapsed time, in seconds.
+    """
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(args):
+
+    # Import parser here, once the benchmark args have been cleared, so that
+    # they are not picked up by the config loader's own argument parser.
+    from fylmlib.parser import parser
+
+    attributes = [
+        ('title', parser.get_title),
+        ('year', parser.get_year),
+        ('edition', parser.get_edition),
+        ('resolution', parser.get_resolution),
+        ('media', parser.get_media),
+        ('is_hdr', parser.is_hdr),
+        ('is_proper', parser.is_proper),
+        ('part', parser.get_part)
+    ]
+
+    paths = load_corpus()
+    count = len(paths)
+
+    print(f'Parsing {count} paths from {", ".join(fixtures)} (best of {args.rounds} rounds)\n')
+
+    # Per-attribute cost
+    for name, func in attributes:
+        t = timed(lambda: [func(p) for p in paths], args.rounds)
+        print(f'  {name:<12} {t / count * 1e6:>9.1f} µs/path')
+
+    # Overall throughput, serial and pooled
+    serial = timed(lambda: parser.parse_many(paths), args.rounds)
+    pooled = timed(lambda: parser.parse_many(paths, processes=args.processes, chunksize=16), args.rounds)
+    serial_rate = count / serial
+
+    print(f'\n  {"parse_many":<12} {serial_rate:>9.0f} paths/s (serial)')
+    print(f'  {"parse_many":<12} {count / pooled:>9.0f} paths/s (pooled, {args.processes or os.cpu_count()} processes)')
+
+    if args.min_rate and serial_rate < args.min_rate:
+        print(f'\nSerial throughput {serial_rate:.0f} paths/s is below the minimum of {args.min_rate:.0f} paths/s')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    args = parse_args()
+    sys.argv = sys.argv[:1]
+    main(args)
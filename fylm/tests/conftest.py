@@ -182,3 +182,8 @@ def expected_path(expected, folder=True):
 def pytest_sessionfinish(session, exitstatus):
     # return
     cleanup_all()
+    # Discard the journal of the moves made by tests
+    from fylmlib.journal import journal
+    journal.close()
+    if os.path.exists(journal.path()):
+        os.remove(journal.path())
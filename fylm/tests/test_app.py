@@ -18,10 +18,15 @@ from builtins import *
 
 import pytest
 import os
+import json
+from math import isclose
 
 import fylm
 import fylmlib.config as config
+from fylmlib.film import Film
+import fylmlib.operations as ops
 import conftest
+import make
 
 # Overwrite the app's pre-loaded config.
 fylm.config = config
@@ -52,6 +57,96 @@ class TestApp(object):
             expected_path = conftest.expected_path(expected, folder=True).lower()
             assert(os.path.exists(expected_path))
 
+    def test_app_plan_and_apply(self, monkeypatch):
+
+        conftest._setup()
+
+        plan_path = os.path.join(conftest.films_src_path, 'plan.json')
+
+        # Write a plan; --plan implies --test
+        fylm.config.plan = plan_path
+        fylm.config.test = True
+        fylm.config.use_folders = True
+        fylm.config.tmdb.enabled = False
+        fylm.main()
+
+        with open(plan_path) as f:
+            plan = json.load(f)
+        assert(len(plan['films']) > 0)
+        for film in plan['films']:
+            assert(len(film['files']) > 0)
+            for file in film['files']:
+                assert(file['strategy'] in ['move', 'copy', 'reflink', 'hardlink', 'symlink'])
+
+        # Assert that nothing was moved
+        planned = [file['destination_path'] for film in plan['films'] for file in film['files']]
+        for path in planned:
+            assert(not os.path.exists(path))
+
+        # Apply the plan, without looking anything up again
+        def search_tmdb(film):
+            raise AssertionError(f'{film.title} was looked up again')
+        monkeypatch.setattr(Film, 'search_tmdb', search_tmdb)
+
+        fylm.config.plan = None
+        fylm.config.apply = plan_path
+        fylm.config.test = False
+        try:
+            fylm.main()
+        finally:
+            fylm.config.apply = None
+
+        # Assert that every file was moved as planned
+        for path in planned:
+            assert(os.path.exists(path))
+
+    def test_app_plan_and_apply_upgrade(self):
+
+        conftest._setup()
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        plan_path = os.path.join(conftest.films_src_path2, 'plan.json')
+        src = os.path.join(conftest.films_src_path, 'Rogue.One.A.Star.Wars.Story.2016.1080p.BluRay.DTS.x264-group.mkv')
+        make.make_mock_file(src, 8192 * make.mb)
+
+        fylm.config.test = True
+        fylm.config.use_folders = True
+        fylm.config.tmdb.enabled = False
+        fylm.config.duplicates.enabled = True
+        fylm.config.duplicates.automatic_upgrading = True
+        fylm.config.duplicates.force_overwrite = False
+
+        def write_plan():
+            ops.dirops._existing_films = None
+            fylm.config.plan = plan_path
+            try:
+                fylm.main()
+            finally:
+                fylm.config.plan = None
+            with open(plan_path) as f:
+                return json.load(f)['films']
+
+        # Create a smaller copy of the film where it will be moved
+        dst = write_plan()[0]['files'][0]['destination_path']
+        make.make_mock_file(dst, 4096 * make.mb)
+
+        # Assert that the plan upgrades the existing copy
+        films = write_plan()
+        assert([d['action'] for d in films[0]['duplicates']] == ['UPGRADE'])
+
+        ops.dirops._existing_films = None
+        fylm.config.apply = plan_path
+        fylm.config.test = False
+        try:
+            fylm.main()
+        finally:
+            fylm.config.apply = None
+
+        # Assert that the existing copy was upgraded
+        assert(not os.path.exists(src))
+        assert(isclose(os.path.getsize(dst), 8192 * make.mb, abs_tol=10))
+
     # @pytest.mark.skip(reason="Slow")
     def test_app_use_folders_true(self):
 
@@ -0,0 +1,110 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, print_function, absolute_import
+from builtins import *
+
+import threading
+
+import pytest
+
+from fylmlib.background import Background
+from fylmlib.console import console
+
+class MockConsole(console):
+    """Records output in the order it is actually printed."""
+    printed = []
+
+    def __init__(self, text):
+        super(MockConsole, self).__init__()
+        self.text = text
+
+    def output(self, should_log=True):
+        MockConsole.printed.append(self.text)
+
+# @pytest.mark.skip()
+class TestBackground(object):
+
+    def test_output_held_until_join(self):
+
+        MockConsole.printed = []
+        processed = []
+        release = threading.Event()
+
+        def func(item):
+            MockConsole(f'{item} started').print()
+            console().print_copy_progress_bar(50, 100)
+            # Hold the first item, so the status shows its progress.
+            if item == 0:
+                release.wait(10)
+            processed.append(item)
+            MockConsole(f'{item} done').print()
+
+        background = Background(func)
+        for i in range(3):
+            background.add(i, f'Film {i}')
+
+        # Assert that output from the background is held, and that the status
+        # shows the item in progress.
+        MockConsole('prompt').print()
+        while background._jobs[0].output.total == 0:
+            release.wait(0.01)
+        assert('Film 0 (1 of 3)' in background.status())
+        assert(MockConsole.printed == ['prompt'])
+
+        release.set()
+        background.join()
+
+        # Assert that every item was processed, and its output printed, in order.
+        assert(processed == [0, 1, 2])
+        assert(MockConsole.printed == ['prompt'] + [f'{i} {s}' for i in range(3) for s in ['started', 'done']])
+        assert(background.status() is None)
+
+    def test_error(self):
+
+        def fail(item):
+            if item == 1:
+                raise ValueError('Failed')
+
+        background = Background(fail)
+        for i in range(3):
+            background.add(i, f'Film {i}')
+
+        with pytest.raises(ValueError):
+            background.join()
+
+    def test_cancel(self):
+
+        processed = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def func(item):
+            started.set()
+            release.wait(10)
+            processed.append(item)
+
+        background = Background(func)
+        for i in range(3):
+            background.add(i, f'Film {i}')
+        started.wait(10)
+
+        # Assert that the item in progress is returned, and left to finish
+        assert(background.cancel() == [0])
+        assert(background.remaining() == 1)
+
+        release.set()
+        background.join()
+        assert(processed == [0])
@@ -20,6 +20,7 @@ import pytest
 
 import fylmlib.config as config
 import fylmlib.operations as ops
+from fylmlib.parser import parser
 import fylm
 import conftest
 
@@ -95,3 +96,43 @@ class TestConfig(object):
 
         # print("\n".join(non_duplicate_films), "\n\n", "\n".join(non_duplicate_valid_films), "\n\n", "\n".join(non_duplicate_remaining_films))
         # assert(len(non_duplicate_remaining_films) == len(non_duplicate_films) - len(non_duplicate_valid_films))
+
+    def test_derived(self):
+
+        conftest._setup()
+
+        assert('.mkv' in config.derived.video_exts)
+        assert('.srt' in config.derived.extra_exts)
+        assert(config.derived.valid_exts == config.derived.video_exts | config.derived.extra_exts)
+        assert(config.derived.destination_dir('1080p') == conftest.films_dst_paths['1080p'])
+        assert(config.derived.destination_dir(None) == conftest.films_dst_paths['SD'])
+
+        # Reassigning an option that the snapshot is derived from rebuilds it
+        config.min_filesize = 5
+        assert(config.derived.min_filesize_for('1080p') == 5 * 1024 * 1024)
+        config.min_filesize = 0
+        assert(config.derived.min_filesize_for('1080p') == 0)
+
+    def test_derived_immutable(self):
+
+        with pytest.raises(AttributeError):
+            config.derived.video_exts = frozenset()
+
+    def test_derived_keep_period(self, monkeypatch):
+
+        conftest._setup()
+
+        monkeypatch.setattr(config, 'keep_period', ['L.A.', 'S.W.A.T.', 'After.Life'])
+        rx = config.derived.keep_period
+        assert(rx.sub(lambda m: config.derived.keep_period_map[m.group().lower()], 'After.life') == 'After.Life')
+
+        # Titles are the same as when each string was matched separately, so
+        # existing destination folders still match
+        assert(parser.get_title('L.A.Confidential.1997.1080p.mkv') == 'L A Confidential')
+        assert(parser.get_title('S.W.A.T.2003.1080p.BluRay.x264-anoXmous/main_file.mkv') == 'S W A T')
+        assert(parser.get_title('After.life.2009.720p.mkv') == 'After life')
+        assert(parser.get_title('Afterlife.2009.720p.mkv') == 'Afterlife')
+
+        monkeypatch.setattr(config, 'keep_period', [])
+        assert(config.derived.keep_period is None)
+        assert(parser.get_title('After.Life.2009.720p.mkv') == 'After Life')
@@ -0,0 +1,74 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, print_function, absolute_import
+from builtins import *
+
+import os
+import socket
+import shutil
+import tempfile
+import threading
+
+import pytest
+
+import fylmlib.config as config
+from fylmlib.control import control
+import conftest
+
+# @pytest.mark.skip()
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='Unix domain sockets are not available')
+class TestControl(object):
+
+    def test_submit(self, capsys):
+
+        # Socket paths are limited in length, so use a short temp dir.
+        tmp = tempfile.mkdtemp()
+        config.control_socket = os.path.join(tmp, 'fylm.sock')
+
+        try:
+            # With no instance listening, paths are processed locally
+            assert(control.submit([conftest.films_src_path]) is None)
+
+            submitted = []
+            def submit(job):
+                submitted.append(job.paths)
+                def process():
+                    for path in job.paths:
+                        job.output(f'Processed {path}')
+                    job.finish(len(job.paths))
+                threading.Thread(target=process).start()
+
+            server = control.serve(submit)
+            assert(server is not None)
+
+            # Only the owner can connect
+            assert(os.stat(config.control_socket).st_mode & 0o777 == 0o600)
+
+            capsys.readouterr()
+            assert(control.submit([conftest.films_src_path]) == 1)
+            assert(submitted == [[conftest.films_src_path]])
+            assert(f'Processed {conftest.films_src_path}' in capsys.readouterr().out)
+
+            # Paths outside the source dirs are rejected
+            assert(control.submit([tmp]) == 0)
+            assert(submitted == [[conftest.films_src_path]])
+            assert('is not in a source dir' in capsys.readouterr().out)
+
+            server.shutdown()
+            server.server_close()
+        finally:
+            config.control_socket = None
+            shutil.rmtree(tmp)
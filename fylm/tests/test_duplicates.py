@@ -565,3 +565,43 @@ class TestDuplicates(object):
             path = os.path.join(conftest.films_src_path, f[0])
             assert(os.path.exists(path))
             assert(isclose(os.path.getsize(path), f[1] * make.gb, abs_tol=10))
+
+    # @pytest.mark.skip()
+    def test_decision_matrix(self):
+
+        from fylmlib.duplicates import duplicates
+        from fylmlib.enums import Should
+
+        conftest._setup()
+
+        # Set up config
+        fylm.config.duplicates.enabled = True
+        fylm.config.duplicates.automatic_upgrading = True
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        src = os.path.join(conftest.films_src_path, raw_files['1080p'])
+        make.make_mock_file(src, 10 * make.gb)
+        make.make_mock_file(os.path.join(conftest.films_dst_paths['720p'], clean_files['720p']), 5 * make.gb)
+
+        # Reset existing films
+        ops.dirops._existing_films = None
+
+        film = Film(src)
+
+        # Assert that one decision is memoized for the video file and its duplicate
+        assert(len(film.duplicate_files) == 1)
+        assert(len(film.duplicate_decisions) == 1)
+        decision = film.duplicate_decisions[0]
+        assert(decision.should == Should.UPGRADE)
+        assert(decision.duplicate is film.duplicate_files[0])
+        assert(duplicates.find_upgradable(film) == [decision.duplicate])
+        assert(duplicates.find_lower_quality(film) == [decision.duplicate])
+        assert(duplicates.find_exact(film) == [])
+
+        # Assert that the matrix is reused, and rebuilt once invalidated
+        assert(film.duplicate_decisions[0] is decision)
+        film._duplicate_decisions = None
+        assert(film.duplicate_decisions[0] is not decision)
+        assert(film.duplicate_decisions[0].should == Should.UPGRADE)
@@ -25,6 +25,7 @@ import fylmlib.config as config
 import fylmlib.patterns as patterns
 import fylm
 import conftest
+from fylmlib.parser import parser
 from fylmlib.enums import Media
 
 # @pytest.mark.skip()
@@ -77,6 +78,18 @@ class TestFilm(object):
                 assert(not film.title_the.lower().startswith('the '))
                 assert(film.title_the.lower().endswith(', the'))
 
+    def test_title_the_invalidated(self):
+
+        conftest._setup()
+
+        film = conftest.valid_films[0]
+        film.title = 'The Last Starfighter'
+        assert(film.title_the == 'Last Starfighter, The')
+
+        # Changing the title should re-derive title_the
+        film.title = 'Starman'
+        assert(film.title_the == 'Starman')
+
     def test_year(self):
 
         conftest._setup()
@@ -166,3 +179,20 @@ class TestFilm(object):
         # Check that ignored films will be ignored
         for ignored in conftest.ignored:
             assert(ignored not in [os.path.basename(f.source_path) for f in conftest.valid_films])
+
+    def test_parse_many(self):
+
+        conftest._setup()
+
+        paths = [film.source_path for film in conftest.films]
+
+        # Records should match the individual parser methods, in order,
+        # whether they are parsed serially or in a process pool.
+        for results in [parser.parse_many(paths), parser.parse_many(paths, processes=2, chunksize=8)]:
+            assert(len(results) == len(paths))
+            for path, result in zip(paths, results):
+                assert(result.path == path)
+                assert(result.title == parser.get_title(path))
+                assert(result.year == parser.get_year(path))
+                assert(result.resolution == parser.get_resolution(path))
+                assert(result.media == parser.get_media(path))
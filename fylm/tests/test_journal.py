@@ -0,0 +1,157 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, print_function, absolute_import
+from builtins import *
+
+
+import os
+
+import pytest
+
+import fylmlib.config as config
+from fylmlib.journal import journal
+import conftest
+import make
+
+class MockFilm(object):
+    pass
+
+def _reset():
+    # Start a new journal, discarding moves made by other tests
+    journal.close()
+    if os.path.exists(journal.path()):
+        os.remove(journal.path())
+
+# @pytest.mark.skip()
+class TestJournal(object):
+
+    def test_recover_roll_back(self, monkeypatch):
+
+        conftest._setup()
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+        config.test = False
+        _reset()
+
+        src = os.path.join(conftest.films_src_path, 'Rogue One - A Star Wars Story (2016) Bluray-1080p.mkv')
+        dst = os.path.join(conftest.films_dst_paths['1080p'], 'Rogue One - A Star Wars Story (2016)/Rogue One - A Star Wars Story (2016) Bluray-1080p.mkv')
+
+        # Simulate a copy that was interrupted after the existing file was renamed
+        make.make_mock_file(src, 10 * make.mb)
+        make.make_mock_file(f'{dst}.dup', 8 * make.mb)
+        make.make_mock_file(f'{dst}.partial~', 2 * make.mb)
+
+        film = MockFilm()
+        tx = journal.tx(film)
+        journal.record(tx, 'move', src=src, dst=dst)
+        journal.record(tx, 'dup', path=dst)
+        journal.close()
+        path = journal.path()
+
+        # Recover as the next run
+        monkeypatch.setattr(journal, 'owner', 'next')
+        assert(journal.recover() == 1)
+
+        # Assert that the existing file was restored, and the partial kept for resuming
+        assert(os.path.exists(dst))
+        assert(not os.path.exists(f'{dst}.dup'))
+        assert(os.path.exists(f'{dst}.partial~'))
+        assert(not os.path.exists(path))
+
+    def test_recover_roll_forward(self, monkeypatch):
+
+        conftest._setup()
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+        config.test = False
+        _reset()
+
+        src = os.path.join(conftest.films_src_path, 'Rogue One - A Star Wars Story (2016) Bluray-1080p.mkv')
+        dst = os.path.join(conftest.films_dst_paths['1080p'], 'Rogue One - A Star Wars Story (2016)/Rogue One - A Star Wars Story (2016) Bluray-1080p.mkv')
+        existing = os.path.join(conftest.films_dst_paths['1080p'], 'Rogue One - A Star Wars Story (2016)/Rogue One - A Star Wars Story (2016) Bluray-720p.mkv')
+
+        # Simulate a move that completed before the upgraded duplicate was deleted
+        make.make_mock_file(dst, 10 * make.mb)
+        make.make_mock_file(f'{existing}.dup', 8 * make.mb)
+
+        film = MockFilm()
+        tx = journal.tx(film)
+        journal.record(tx, 'dup', path=existing)
+        journal.record(tx, 'move', src=src, dst=dst)
+
+        # A committed transaction is not recovered
+        committed = MockFilm()
+        journal.record(journal.tx(committed), 'dup', path=dst)
+        journal.commit(committed)
+        journal.close()
+
+        # Recover as the next run
+        monkeypatch.setattr(journal, 'owner', 'next')
+        assert(journal.recover() == 1)
+
+        # Assert that the upgraded duplicate was deleted
+        assert(os.path.exists(dst))
+        assert(not os.path.exists(f'{existing}.dup'))
+        assert(not os.path.exists(existing))
+
+    def test_recover_skips_running(self, monkeypatch):
+
+        conftest._setup()
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+        config.test = False
+        _reset()
+
+        existing = os.path.join(conftest.films_dst_paths['1080p'], 'Rogue One - A Star Wars Story (2016)/Rogue One - A Star Wars Story (2016) Bluray-720p.mkv')
+        make.make_mock_file(f'{existing}.dup', 8 * make.mb)
+
+        # Simulate another process that is still running
+        film = MockFilm()
+        journal.record(journal.tx(film), 'dup', path=existing)
+        path = journal.path()
+        monkeypatch.setattr(journal, '_file', None)
+        monkeypatch.setattr(journal, 'owner', 'next')
+
+        try:
+            # Its transaction is left alone
+            assert(journal.recover() == 0)
+            assert(os.path.exists(f'{existing}.dup'))
+            assert(os.path.exists(path))
+        finally:
+            monkeypatch.undo()
+            journal.close()
+
+        # Once it exits, its transaction is recovered
+        monkeypatch.setattr(journal, 'owner', 'next')
+        assert(journal.recover() == 1)
+        assert(os.path.exists(existing))
+        assert(not os.path.exists(path))
+
+    def test_close_committed(self):
+
+        conftest._setup()
+        config.test = False
+        _reset()
+
+        # A film whose duplicates were renamed, but was not moved
+        film = MockFilm()
+        journal.record(journal.tx(film), 'dup', path='/nonexistent')
+        journal.commit(film)
+        path = journal.path()
+
+        # The journal is removed when every transaction is committed
+        journal.close()
+        assert(not os.path.exists(path))
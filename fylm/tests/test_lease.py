@@ -0,0 +1,130 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, print_function, absolute_import
+from builtins import *
+
+import os
+import time
+
+import pytest
+
+import fylmlib.config as config
+import fylmlib.operations as ops
+from fylmlib.lease import lease
+import conftest
+import make
+
+# @pytest.mark.skip()
+class TestLease(object):
+
+    def test_acquire_and_release(self):
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+        config.leases = True
+        config.lease_ttl = 60
+
+        try:
+            path = os.path.join(conftest.films_src_path, 'Rogue One - A Star Wars Story (2016) Bluray-1080p.mkv')
+            make.make_mock_file(path, 10 * make.mb)
+
+            assert(lease.acquire(path))
+            assert(os.path.exists(lease.path(path)))
+
+            # A film that is already claimed cannot be claimed again
+            assert(not lease.acquire(path))
+
+            # The lease dir is not treated as a film
+            assert(lease.dirname not in ops.dirops.sanitize_dir_list(os.listdir(conftest.films_src_path)))
+
+            lease.release(path)
+            assert(not os.path.exists(lease.path(path)))
+            assert(not os.path.exists(os.path.dirname(lease.path(path))))
+
+            # An expired lease can be reclaimed
+            assert(lease.acquire(path))
+            expired = time.time() - config.lease_ttl - 1
+            os.utime(lease.path(path), (expired, expired))
+            assert(lease.acquire(path))
+
+            # Renewing a lease keeps it from expiring
+            os.utime(lease.path(path), (expired, expired))
+            lease.renew()
+            assert(not lease.acquire(path))
+
+            lease.release(path)
+        finally:
+            config.leases = False
+
+    def test_renamed(self):
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+        config.leases = True
+        config.lease_ttl = 60
+
+        try:
+            path = os.path.join(conftest.films_src_path, 'Rogue.One.A.Star.Wars.Story.2016.1080p.BluRay.DTS.x264-DON.mkv')
+            renamed = os.path.join(conftest.films_src_path, 'Rogue One - A Star Wars Story (2016) Bluray-1080p.mkv')
+            make.make_mock_file(path, 10 * make.mb)
+
+            assert(lease.acquire(path))
+
+            # A film renamed in place is still claimed
+            os.rename(path, renamed)
+            assert(not lease.acquire(renamed))
+
+            # A film that no longer exists cannot be claimed
+            assert(not lease.acquire(path))
+
+            lease.release(path)
+            assert(lease.acquire(renamed))
+            lease.release(renamed)
+        finally:
+            config.leases = False
+
+    def test_reclaim_renewed(self, monkeypatch):
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+        config.leases = True
+        config.lease_ttl = 60
+
+        try:
+            path = os.path.join(conftest.films_src_path, 'Rogue One - A Star Wars Story (2016) Bluray-1080p.mkv')
+            make.make_mock_file(path, 10 * make.mb)
+
+            assert(lease.acquire(path))
+            expired = time.time() - config.lease_ttl - 1
+            os.utime(lease.path(path), (expired, expired))
+
+            # Simulate the lease being renewed after it was found to be expired,
+            # but before it was renamed
+            rename = os.rename
+            def renew_then_rename(src, dst):
+                os.utime(src)
+                rename(src, dst)
+            monkeypatch.setattr(os, 'rename', renew_then_rename)
+
+            # Assert that the renewed lease is given back
+            assert(not lease.acquire(path))
+            monkeypatch.undo()
+            assert(os.path.exists(lease.path(path)))
+            assert(len(os.listdir(os.path.dirname(lease.path(path)))) == 1)
+
+            lease.release(path)
+        finally:
+            config.leases = False
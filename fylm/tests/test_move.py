@@ -269,3 +269,194 @@ class TestMove(object):
         move = ops.fileops.safe_move(src, dst)
 
         assert(move is False)
+
+    def test_verified_copy(self):
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        data = os.urandom(3 * make.mb)
+        make.make_mock_file(src, 0)
+        with open(src, 'wb') as f:
+            f.write(data)
+
+        config.test = False
+        config.safe_copy = True
+        config.verify_copies = True
+        config.transfer_modes = {'default': 'copy'}
+        config.verify_samples = 4
+        config.verify_sample_size = 0.25
+
+        move = ops.fileops.safe_move(src, dst)
+
+        assert(move is True)
+        assert(not os.path.exists(src))
+        assert(os.path.exists(dst))
+
+        # Assert that a verifier detects corruption in a sampled region
+        verifier = ops._CopyVerifier(len(data))
+        assert(len(verifier.regions) == 4)
+        verifier.update(0, data)
+        assert(verifier.verify(dst) is True)
+        with open(dst, 'r+b') as f:
+            f.seek(len(data) - 1)
+            f.write(bytes([data[-1] ^ 1]))
+        assert(verifier.verify(dst) is False)
+
+        # Reset config
+        config.safe_copy = False
+        config.verify_copies = False
+        config.transfer_modes = {'default': 'copy'}
+
+    def test_verify_mismatch(self, monkeypatch):
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        make.make_mock_file(src, 3 * make.mb)
+        make.make_mock_file(dst, 1 * make.mb)
+        existing_size = os.path.getsize(dst)
+
+        config.test = False
+        config.safe_copy = True
+        config.verify_copies = True
+        config.resume_copies = True
+        config.transfer_modes = {'default': 'copy'}
+
+        # Simulate data that was corrupted while copying
+        monkeypatch.setattr(ops._CopyVerifier, 'verify', lambda self, path: False)
+
+        move = ops.fileops.safe_move(src, dst, ok_to_upgrade=True)
+
+        # Assert that the corrupt copy was discarded, so it won't be resumed,
+        # and that the file it was replacing was restored
+        assert(move is False)
+        assert(os.path.exists(src))
+        assert(not os.path.exists(f'{dst}.partial~'))
+        assert(not os.path.exists(f'{dst}.dup'))
+        assert(os.path.getsize(dst) == existing_size)
+
+        # Reset config
+        config.safe_copy = False
+        config.verify_copies = False
+        config.transfer_modes = {'default': 'copy'}
+
+    def test_link_transfer_modes(self):
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        make.make_mock_file(src, sm_size)
+
+        config.test = False
+        config.safe_copy = False
+        config.transfer_modes = {'default': 'copy', '1080p': 'hardlink'}
+        assert(config.derived.transfer_mode(dst) == 'hardlink')
+        assert(config.derived.transfer_mode(src) == 'copy')
+
+        # Assert that a hard link leaves the source in place
+        move = ops.fileops.safe_move(src, dst)
+
+        assert(move is True)
+        assert(os.path.exists(src))
+        assert(os.path.exists(dst))
+        assert(os.path.samefile(src, dst))
+
+        # Assert that a symlink leaves the source in place
+        os.remove(dst)
+        config.transfer_modes = {'default': 'symlink'}
+
+        move = ops.fileops.safe_move(src, dst)
+
+        assert(move is True)
+        assert(os.path.exists(src))
+        assert(os.path.islink(dst))
+        assert(os.path.realpath(dst) == os.path.realpath(src))
+
+        # Reset config
+        config.transfer_modes = {'default': 'copy'}
+
+    def test_link_leaves_source_folder(self):
+
+        from fylmlib.film import Film
+        from fylmlib.processor import processor
+
+        conftest._setup()
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        make.make_mock_file(src, sm_size)
+        unwanted = os.path.join(os.path.dirname(src), 'Rogue.One.nfo')
+        make.make_mock_file(unwanted, 1)
+
+        config.test = False
+        config.tmdb.enabled = False
+        config.remove_source = True
+        config.remove_unwanted_files = True
+        config.transfer_modes = {'default': 'symlink'}
+
+        try:
+            film = Film(os.path.dirname(src))
+            (film, queued_ops) = processor.prepare_folder(film)
+
+            # Assert that the source was not renamed
+            assert(os.path.exists(src))
+
+            assert(processor.transfer(film, queued_ops))
+            processor.finalize(film, queued_ops[0].dst)
+
+            # Assert that the source folder was not cleaned up, so the links still resolve
+            assert(os.path.exists(src))
+            assert(os.path.exists(unwanted))
+            assert(os.path.islink(queued_ops[0].dst))
+            assert(os.path.realpath(queued_ops[0].dst) == os.path.realpath(src))
+        finally:
+            config.transfer_modes = {'default': 'copy'}
+            config.tmdb.enabled = True
+
+    def test_resume_partial_copy(self):
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        data = os.urandom(3 * make.mb)
+        make.make_mock_file(src, 0)
+        with open(src, 'wb') as f:
+            f.write(data)
+
+        # Create a partial copy of the first 2.5 MB, as if it had been interrupted
+        partial_dst = f'{dst}.partial~'
+        make.make_mock_file(partial_dst, 0)
+        with open(partial_dst, 'wb') as f:
+            f.write(data[:int(2.5 * make.mb)])
+
+        config.test = False
+        config.safe_copy = True
+        config.resume_copies = True
+        config.verify_copies = True
+        config.transfer_modes = {'default': 'copy'}
+        config.verify_samples = 4
+        config.verify_sample_size = 0.25
+
+        # Assert that the partial is kept, less the last 1 MB
+        assert(ops.fileops.resume_offset(src, partial_dst) == int(1.5 * make.mb))
+
+        move = ops.fileops.safe_move(src, dst)
+
+        assert(move is True)
+        assert(not os.path.exists(src))
+        assert(not os.path.exists(partial_dst))
+        with open(dst, 'rb') as f:
+            assert(f.read() == data)
+
+        # Assert that a partial that does not match the source is started over
+        with open(src, 'wb') as f:
+            f.write(data)
+        with open(partial_dst, 'wb') as f:
+            f.write(bytes(int(2.5 * make.mb)))
+        assert(ops.fileops.resume_offset(src, partial_dst) == 0)
+
+        # Reset config
+        config.safe_copy = False
+        config.verify_copies = False
+        config.transfer_modes = {'default': 'copy'}
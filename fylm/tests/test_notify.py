@@ -17,6 +17,9 @@ from __future__ import unicode_literals, print_function, absolute_import
 from builtins import *
 
 import os
+import time
+import threading
+from types import SimpleNamespace
 
 import pytest
 
@@ -54,3 +57,137 @@ class TestPlex(object):
     def test_plex_fail(self):
 
         plex = PlexServer(baseurl="http://127.0.0.1:12701", token="BAD_TOKEN", timeout=2)
+
+class TestDispatcher(object):
+
+    def test_pushover_digest(self, monkeypatch):
+
+        sent = []
+        attempts = []
+        def send(films):
+            attempts.append(films)
+            # Fail the first attempt, so that it is retried
+            if len(attempts) == 1:
+                raise IOError('Connection refused')
+            sent.append(films)
+        monkeypatch.setattr(notify, '_send_pushover', send)
+
+        monkeypatch.setattr(config, 'test', False)
+        monkeypatch.setattr(config, 'quiet', False)
+        monkeypatch.setattr(config, 'rename_only', False)
+        monkeypatch.setattr(config.pushover, 'enabled', True)
+        monkeypatch.setattr(config.notifications, 'batch_minutes', 0)
+
+        films = [SimpleNamespace(title='Arrival', year=2016, overview='', poster_path=None),
+                 SimpleNamespace(title='Sicario', year=2015, overview='', poster_path=None)]
+        for film in films:
+            notify.pushover(film)
+
+        # Nothing is sent until the batch is flushed
+        assert(sent == [])
+
+        assert(notify.flush(10))
+        assert(len(attempts) == 2)
+        assert(len(sent) == 1)
+        assert([f['title'] for f in sent[0]] == ['Arrival', 'Sicario'])
+
+        # Flushing again sends nothing new
+        assert(notify.flush(10))
+        assert(len(sent) == 1)
+
+    def test_pushover_batch_minutes(self, monkeypatch):
+
+        sent = []
+        monkeypatch.setattr(notify, '_send_pushover', lambda films: sent.append(films))
+
+        monkeypatch.setattr(config, 'test', False)
+        monkeypatch.setattr(config, 'quiet', False)
+        monkeypatch.setattr(config, 'rename_only', False)
+        monkeypatch.setattr(config.pushover, 'enabled', True)
+        monkeypatch.setattr(config.notifications, 'batch_minutes', 10)
+
+        notify.pushover(SimpleNamespace(title='Arrival', year=2016, overview='', poster_path=None))
+
+        # A flush that doesn't wait (e.g. after each batch in watch mode) leaves
+        # the digest on its schedule
+        assert(notify.flush())
+        time.sleep(0.5)
+        assert(sent == [])
+
+        # Waiting (e.g. before exiting) sends it now
+        assert(notify.flush(10))
+        assert(len(sent) == 1)
+
+    def test_unsent(self, monkeypatch):
+
+        sending = threading.Event()
+        monkeypatch.setattr(notify, '_send_pushover', lambda films: sending.wait(10))
+
+        monkeypatch.setattr(config, 'test', False)
+        monkeypatch.setattr(config, 'quiet', False)
+        monkeypatch.setattr(config, 'rename_only', False)
+        monkeypatch.setattr(config.pushover, 'enabled', True)
+        monkeypatch.setattr(config.notifications, 'batch_minutes', 0)
+
+        notify.pushover(SimpleNamespace(title='Arrival', year=2016, overview='', poster_path=None))
+
+        # Assert that notifications that could not be sent in time are described
+        try:
+            assert(not notify.flush(0.5))
+            assert(notify.unsent() == ['Pushover (Arrival (2016))'])
+        finally:
+            sending.set()
+        assert(notify.flush(10))
+        assert(notify.unsent() == [])
+
+        # By default, wait long enough for every attempt to time out
+        monkeypatch.setattr(config.notifications, 'flush_timeout', None)
+        attempts = config.notifications.retries + 1
+        assert(notify.flush_timeout() > attempts * (notify._PLEX_TIMEOUT + config.posters.timeout))
+
+    def test_plex_scans_changed_folders(self, monkeypatch):
+
+        root = os.path.join(os.sep, 'media', 'Movies')
+        scanned = []
+
+        class MockSection(object):
+            locations = [root]
+            def update(self, path=None):
+                scanned.append(path)
+
+        class MockPlexServer(object):
+            def __init__(self, **kwargs):
+                self.library = SimpleNamespace(section=lambda name: section)
+
+        section = MockSection()
+        monkeypatch.setattr(notify, 'PlexServer', MockPlexServer)
+
+        monkeypatch.setattr(config, 'test', False)
+        monkeypatch.setattr(config, 'quiet', False)
+        monkeypatch.setattr(config, 'rename_only', False)
+        monkeypatch.setattr(config.plex, 'enabled', True)
+        monkeypatch.setattr(config.plex, 'sections', ['Movies'])
+        monkeypatch.setattr(config.plex, 'debounce', 60)
+
+        arrival = os.path.join(root, 'Arrival (2016)')
+        sicario = os.path.join(root, 'Sicario (2015)')
+        notify.plex(arrival)
+        notify.plex(sicario)
+        notify.plex(arrival)
+        notify.plex(os.path.join(arrival, 'Extras'))
+
+        # Scans are debounced, unless waiting for them to be sent
+        assert(notify.flush())
+        time.sleep(0.5)
+        assert(scanned == [])
+        assert(notify.flush(10))
+
+        # Each changed folder is scanned once, instead of the whole section
+        assert(sorted(scanned) == [arrival, sicario])
+
+        # A folder outside of the section causes a full scan
+        del scanned[:]
+        notify.plex(os.path.join(os.sep, 'elsewhere', 'Arrival (2016)'))
+        notify.plex(arrival)
+        assert(notify.flush(10))
+        assert(scanned == [None])
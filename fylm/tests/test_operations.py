@@ -207,6 +207,36 @@ class TestDirOperations(object):
         assert(os.path.join(conftest.films_src_path, files[0]) not in invalid_files) # Main video file
         assert(os.path.join(conftest.films_src_path, files[4]) not in invalid_files) # .srt
 
+    def test_get_files(self):
+
+        conftest._setup()
+
+        fylm.config.min_filesize = 50 # min filesize in MB
+
+        files = [
+            'Rogue.One.2016.1080p.BluRay.DTS.x264-group/Rogue.One.2016.1080p.BluRay.DTS.x264-group.mkv',
+            'Rogue.One.2016.1080p.BluRay.DTS.x264-group/Rogue.One.2016.1080p.BluRay.DTS.x264-group.sample.mkv',
+            'Rogue.One.2016.1080p.BluRay.DTS.x264-group/subs-english.srt',
+            'Rogue.One.2016.1080p.BluRay.DTS.x264-group/Rogue.One.2016.1080p.BluRay.DTS.x264-group.nfo'
+        ]
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        make.make_mock_file(os.path.join(conftest.films_src_path, files[0]), 2354 * make.mb * t)
+        make.make_mock_file(os.path.join(conftest.films_src_path, files[1]),  134 * make.mb * t)
+        make.make_mock_file(os.path.join(conftest.films_src_path, files[2]),   14 * make.kb * t)
+        make.make_mock_file(os.path.join(conftest.films_src_path, files[3]),    5 * make.kb * t)
+
+        path = os.path.join(conftest.films_src_path, 'Rogue.One.2016.1080p.BluRay.DTS.x264-group')
+        (valid_files, invalid_files) = ops.dirops.get_files(path)
+
+        # Assert that a single search returns the same results as searching for each
+        assert(valid_files == ops.dirops.get_valid_files(path))
+        assert(sorted(invalid_files) == sorted(ops.dirops.get_invalid_files(path)))
+        assert(len(valid_files) == 2)
+        assert(len(invalid_files) == 2)
+
     def test_sanitize_dir_list(self):
 
         conftest.cleanup_all()
@@ -0,0 +1,127 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, print_function, absolute_import
+from builtins import *
+
+import time
+import random
+import threading
+
+import pytest
+
+import fylmlib.config as config
+import fylmlib.patterns as patterns
+from fylmlib.pipeline import Pipeline, Stage
+from fylmlib.console import console
+from fylmlib.log import log
+
+class MockConsole(console):
+    """Records output in the order it is actually printed."""
+    printed = []
+
+    def __init__(self, text):
+        super(MockConsole, self).__init__()
+        self.text = text
+
+    def output(self, should_log=True):
+        MockConsole.printed.append(self.text)
+
+# @pytest.mark.skip()
+class TestPipeline(object):
+
+    def test_output_order(self):
+
+        MockConsole.printed = []
+
+        def stage(name):
+            def func(item):
+                # Vary how long each item takes, so they finish out of order.
+                time.sleep(random.random() / 100)
+                MockConsole(f'{item} {name}').print()
+                return item
+            return func
+
+        def drop_odd(item):
+            MockConsole(f'{item} filter').print()
+            return item if item % 2 == 0 else None
+
+        Pipeline([
+            Stage('first', stage('first'), 4),
+            Stage('filter', drop_odd, 2),
+            Stage('last', stage('last'), 3)], maxsize=2).run(range(10))
+
+        # Assert that each item's output is printed together, in order, and
+        # that dropped items did not reach the last stage.
+        expected = []
+        for i in range(10):
+            expected += [f'{i} first', f'{i} filter']
+            if i % 2 == 0:
+                expected.append(f'{i} last')
+        assert(MockConsole.printed == expected)
+
+    def test_error(self):
+
+        def fail(item):
+            if item == 3:
+                raise ValueError('Failed')
+            return item
+
+        with pytest.raises(ValueError):
+            Pipeline([Stage('fail', fail, 2), Stage('pass', lambda i: i)]).run(range(10))
+
+    def test_debug_order(self, monkeypatch):
+
+        logged = []
+        monkeypatch.setattr(config, 'debug', True)
+        monkeypatch.setattr(log, 'debug', lambda text: logged.append(patterns.ansi_escape.sub('', text)))
+
+        def stage(name):
+            def func(item):
+                time.sleep(random.random() / 100)
+                console.debug(f'{item} {name}')
+                return item
+            return func
+
+        Pipeline([
+            Stage('first', stage('first'), 4),
+            Stage('last', stage('last'), 3)], maxsize=2).run(range(10))
+
+        # Assert that debug output is logged with the rest of each item's output.
+        expected = []
+        for i in range(10):
+            expected += [f'{i} first', f'{i} last']
+        assert(logged == expected)
+
+    def test_tee(self):
+
+        teed = []
+        other = threading.Thread(target=lambda: console('other').print())
+
+        def stage(item):
+            time.sleep(random.random() / 100)
+            console(f'{item}').print()
+            return item
+
+        console.tee(teed.append)
+        try:
+            other.start()
+            Pipeline([Stage('first', stage, 4)], maxsize=2).run(range(5))
+            other.join()
+        finally:
+            console.tee(None)
+
+        # Assert that only output printed for the pipeline's items was teed
+        assert(teed == [f'{i}' for i in range(5)])
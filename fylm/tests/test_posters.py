@@ -0,0 +1,81 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, print_function, absolute_import
+from builtins import *
+
+import os
+import time
+import shutil
+
+import pytest
+
+import fylmlib.config as config
+from fylmlib.posters import posters
+import conftest
+
+# @pytest.mark.skip()
+class TestPosters(object):
+
+    def test_cached_and_evicted(self, monkeypatch):
+
+        cache_path = os.path.join(conftest.films_src_path, '.cache.posters')
+        shutil.rmtree(cache_path, ignore_errors=True)
+        monkeypatch.setattr(posters, 'cache_path', cache_path)
+
+        images = {
+            'arrival.jpg': b'a' * 1024,
+            'arrival-alt.jpg': b'a' * 1024,
+            'sicario.jpg': b'b' * 1024,
+            'prisoners.jpg': b'c' * 1024
+        }
+        fetched = []
+        def mock_fetch(poster_path):
+            fetched.append(poster_path)
+            return posters._store(poster_path, images[poster_path])
+        monkeypatch.setattr(posters, '_fetch', mock_fetch)
+
+        # Room for two posters
+        monkeypatch.setattr(config.posters, 'cache_size', 2048 / 1024 / 1024)
+
+        # Assert that a poster is only downloaded once
+        arrival = posters.get('arrival.jpg')
+        assert(posters.get('arrival.jpg') == arrival)
+        assert(fetched == ['arrival.jpg'])
+        with open(arrival, 'rb') as f:
+            assert(f.read() == images['arrival.jpg'])
+
+        # Assert that identical images are only stored once
+        assert(posters.get('arrival-alt.jpg') == arrival)
+        assert(len([f for f in os.listdir(cache_path) if f.endswith('.jpg')]) == 1)
+
+        # Assert that the least recently used poster is evicted once the cache is full
+        sicario = posters.get('sicario.jpg')
+        os.utime(arrival, (time.time() - 60, time.time() - 60))
+        posters.get('prisoners.jpg')
+        assert(not os.path.exists(arrival))
+        assert(os.path.exists(sicario))
+
+        # Assert that an evicted poster is downloaded again
+        del fetched[:]
+        posters.prefetch(['arrival.jpg', 'sicario.jpg'])
+        assert(posters.get('arrival.jpg') == arrival)
+        assert(fetched == ['arrival.jpg'])
+
+        shutil.rmtree(cache_path, ignore_errors=True)
+
+    def test_missing_poster(self):
+
+        assert(posters.get(None) is None)
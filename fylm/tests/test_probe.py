@@ -0,0 +1,157 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, print_function, absolute_import
+from builtins import *
+
+
+import os
+import time
+import threading
+
+import pytest
+
+import fylmlib.config as config
+from fylmlib.probe import probe, Metadata
+import conftest
+import make
+
+# @pytest.mark.skip()
+class TestProbe(object):
+
+    def test_metadata_cached(self, monkeypatch):
+
+        conftest._setup()
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        path = os.path.join(conftest.films_src_path, 'Probe.Test.2010.mkv')
+        make.make_mock_file(path, 1 * make.mb)
+
+        probed = []
+        def mock_probe(p):
+            probed.append(p)
+            return Metadata(width=1920, height=1080, codec='AVC', hdr_format=None, duration=6000.0)
+        monkeypatch.setattr(probe, '_probe', mock_probe)
+
+        # Assert that an unchanged file is only probed once
+        assert(probe.metadata(path).width == 1920)
+        assert(probe.metadata(path).width == 1920)
+        assert(len(probed) == 1)
+
+        # Assert that a modified file is probed again
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+        assert(probe.metadata(path).height == 1080)
+        assert(len(probed) == 2)
+
+    def test_metadata_missing_file(self):
+
+        assert(probe.metadata('/nonexistent/Probe.Test.2010.mkv') is None)
+
+    def test_prefetch(self, monkeypatch):
+
+        from fylmlib.film import Film
+
+        conftest._setup()
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        named = os.path.join(conftest.films_src_path, 'Probe.Test.2010.1080p.mkv')
+        unnamed = os.path.join(conftest.films_src_path, 'Probe Test.mkv')
+        make.make_mock_file(named, 1 * make.mb)
+        make.make_mock_file(unnamed, 1 * make.mb)
+
+        probed = []
+        def mock_probe(p):
+            probed.append(p)
+            return Metadata(width=1280, height=720, codec='AVC', hdr_format=None, duration=6000.0)
+        monkeypatch.setattr(probe, '_probe', mock_probe)
+
+        # Prefetch before the films are loaded, as get_new_films does
+        probe.prefetch([named, unnamed])
+        films = [Film(named), Film(unnamed)]
+
+        # Assert that only the file without a resolution in its name was probed,
+        # and only once, even though loading the film needed its metadata
+        assert(probed == [unnamed])
+        assert(films[1].all_valid_files[0].resolution == '720p')
+        assert(probed == [unnamed])
+
+    def test_prefetch_deadline(self, monkeypatch):
+
+        conftest._setup()
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        paths = [os.path.join(conftest.films_src_path, f'Probe Test {i}.mkv') for i in range(3)]
+        for path in paths:
+            make.make_mock_file(path, 1 * make.mb)
+
+        release = threading.Event()
+        probed = []
+        def mock_probe(p):
+            probed.append(p)
+            release.wait(10)
+            return None
+        monkeypatch.setattr(probe, '_probe', mock_probe)
+        monkeypatch.setattr(config.probe, 'timeout', 0.5)
+
+        try:
+            start = time.time()
+            probe.prefetch(paths)
+
+            # Assert that the whole batch shares one deadline, rather than
+            # waiting the full timeout for each file in turn
+            assert(all(probe.metadata(p) is None for p in paths))
+            assert(time.time() - start < 1.5)
+
+            # Assert that files that timed out are not probed again on demand
+            assert(probe.metadata(paths[2]) is None)
+            assert(len(probed) == len(set(probed)))
+
+            # Assert that probes are run by daemon threads, so that a stuck
+            # probe cannot keep the process from exiting
+            assert(all(w.daemon for w in probe._workers))
+        finally:
+            release.set()
+
+    def test_fingerprint(self, monkeypatch):
+
+        conftest._setup()
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        monkeypatch.setattr(probe, 'sample_size', 1024)
+
+        a = os.path.join(conftest.films_src_path, 'Probe.Test.2010.1080p.mkv')
+        b = os.path.join(conftest.films_src_path, 'Probe.Test.2010.720p.mkv')
+        make.make_mock_file(a, 1 * make.mb)
+        make.make_mock_file(b, 1 * make.mb)
+
+        # Assert that identical contents have the same fingerprint, regardless of name
+        assert(probe.fingerprint(a) is not None)
+        assert(probe.fingerprint(a) == probe.fingerprint(b))
+
+        # Assert that a change in a sampled region changes the fingerprint
+        with open(b, 'r+b') as f:
+            f.seek(make.mb // 2)
+            f.write(b'x')
+        st = os.stat(b)
+        os.utime(b, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+        assert(probe.fingerprint(a) != probe.fingerprint(b))
+
+        # Assert that a missing file has no fingerprint
+        assert(probe.fingerprint('/nonexistent/Probe.Test.2010.mkv') is None)
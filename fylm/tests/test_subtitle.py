@@ -0,0 +1,50 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, print_function, absolute_import
+from builtins import *
+
+import pytest
+
+from fylmlib.subtitle import Subtitle
+
+# @pytest.mark.skip()
+class TestSubtitle(object):
+
+    def test_language_by_name(self):
+
+        sub = Subtitle('The.Planet.Beyond.2010.1080p.BluRay.x264-Group.english-sdh')
+        assert(sub.code == 'en')
+        assert(sub.language == 'English')
+        assert(sub.captured == 'English-sdh')
+
+    def test_language_by_code(self):
+
+        sub = Subtitle('The Planet Beyond (2010) 1080p.fr')
+        assert(sub.code == 'fr')
+        assert(sub.language == 'French')
+        assert(sub.captured == 'Fr')
+
+    def test_no_language(self):
+
+        sub = Subtitle('The Planet Beyond (2010) 1080p')
+        assert(sub.code is None)
+        assert(sub.captured is None)
+        assert(sub.insert_lang('The Planet Beyond (2010) 1080p.srt') is None)
+
+    def test_insert_lang(self):
+
+        sub = Subtitle('The.Planet.Beyond.2010.1080p.BluRay.x264-Group.portuguese-br')
+        assert(sub.insert_lang('/films/The Planet Beyond (2010).srt') == '/films/The Planet Beyond (2010).Portuguese-br.srt')
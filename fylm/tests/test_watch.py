@@ -0,0 +1,145 @@
+# -*- coding: future_fstrings -*-
+# Copyright 2018 Brandon Shelley. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import unicode_literals, print_function, absolute_import
+from builtins import *
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+import fylmlib.config as config
+from fylmlib.watch import watch, _Inotify
+import conftest
+import make
+
+# @pytest.mark.skip()
+class TestWatch(object):
+
+    @pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify is only available on Linux')
+    def test_inotify(self):
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        notifier = _Inotify([conftest.films_src_path])
+
+        folder = os.path.join(conftest.films_src_path, 'Rogue One - A Star Wars Story (2016)')
+        os.makedirs(folder)
+        assert(notifier.read(1) == set([folder]))
+
+        # Changes deep inside a new folder are reported as changes to the folder
+        make.make_mock_file(os.path.join(folder, 'Sample/sample.mkv'), 1 * make.mb)
+        assert(notifier.read(1) == set([folder]))
+
+        assert(notifier.read(0) == set())
+
+    def test_scan(self):
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+        config.source_dirs = [conftest.films_src_path]
+
+        watch._snapshot = watch._stat_items()
+        assert(watch._wait(None, 0) == set())
+
+        path = os.path.join(conftest.films_src_path, 'Rogue One - A Star Wars Story (2016) Bluray-1080p.mkv')
+        make.make_mock_file(path, 10 * make.mb)
+        assert(watch._wait(None, 0) == set([path]))
+
+        # Items are only ready once they have not changed for long enough
+        watch._pending = {}
+        watch._changed(path)
+        config.watch_settle = 60
+        assert(watch._ready() == [])
+        config.watch_settle = 0
+        assert(watch._ready() == [path])
+
+    def test_films(self):
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        folder = os.path.join(conftest.films_src_path, 'Rogue One - A Star Wars Story (2016)')
+        path = os.path.join(conftest.films_src_path, 'Furious 7 (2015) Bluray-1080p.mkv')
+        make.make_mock_file(os.path.join(folder, 'Rogue One - A Star Wars Story (2016) Bluray-1080p.mkv'), 10 * make.mb)
+        make.make_mock_file(path, 10 * make.mb)
+
+        # Items found by watching are each a film
+        assert([f.original_path for f in watch.films([folder])] == [folder])
+
+        # Submitted source dirs are searched for films, like --source
+        assert([f.original_path for f in watch.films([conftest.films_src_path], discover=True)] == [path, folder])
+        assert([f.original_path for f in watch.films([path], discover=True)] == [path])
+
+    def test_error(self, monkeypatch):
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+        monkeypatch.setattr(config, 'source_dirs', [conftest.films_src_path])
+        monkeypatch.setattr(config, 'control', False)
+
+        path = os.path.join(conftest.films_src_path, 'Rogue One - A Star Wars Story (2016) Bluray-1080p.mkv')
+        make.make_mock_file(path, 10 * make.mb)
+
+        processed = []
+        def process(films):
+            processed.append([f.original_path for f in films])
+            if len(processed) == 1:
+                raise ValueError('Failed')
+            raise KeyboardInterrupt()
+
+        monkeypatch.setattr(watch, 'process', process)
+        monkeypatch.setattr(watch, '_wait', lambda notifier, timeout: set())
+        monkeypatch.setattr(watch, '_ready', lambda: [path])
+
+        # Assert that watching continues after a batch fails
+        with pytest.raises(KeyboardInterrupt):
+            watch.run()
+        assert(processed == [[path], [path]])
+
+    @pytest.mark.skipif(not os.path.isdir('/proc'), reason='/proc is not available')
+    def test_is_complete(self):
+
+        conftest.cleanup_all()
+        conftest.make_empty_dirs()
+
+        folder = os.path.join(conftest.films_src_path, 'Rogue One - A Star Wars Story (2016)')
+        path = os.path.join(folder, 'Rogue One - A Star Wars Story (2016) Bluray-1080p.mkv')
+        make.make_mock_file(path, 10 * make.mb)
+
+        watch._pending = {}
+        watch._changed(folder)
+        assert(watch.is_complete(folder))
+
+        # A file that grows is not complete until it stops changing
+        make.make_mock_file(path, 12 * make.mb)
+        assert(not watch.is_complete(folder))
+        assert(watch.is_complete(folder))
+
+        # A file that another process has open for writing is not complete
+        writer = subprocess.Popen([sys.executable, '-c',
+            'import sys, time; f = open(sys.argv[1], "ab"); print("open", flush=True); time.sleep(30)', path],
+            stdout=subprocess.PIPE)
+        try:
+            writer.stdout.readline()
+            assert(not watch.is_complete(folder))
+        finally:
+            writer.kill()
+            writer.wait()
+            writer.stdout.close()
+        assert(watch.is_complete(folder))